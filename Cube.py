@@ -55,7 +55,12 @@ my_cube.translate("U F F' B D R2")
 print(f'afterwards:\n\n { str(my_cube) } \n\n')
 """
 
-import numpy as np
+from array import array
+from functools import lru_cache
+from notation import NotationError, notation_sources, parse_notation, parse_notation_positions
+from operator import itemgetter
+from table_cache import cached_table, code_sources
+import instrumentation
 
 POSSIBLE_MOVES = [
     'F', 'B', 'U', 'D', 'L', 'R',
@@ -119,46 +124,383 @@ LETTER_BOARD = [
      ['X', 'w', 'W']]
 ]
 
-# translate cube notation in function name
-TRANSLATION_DICTIONARY = {
-    'F': 'F',
-    'B': 'B',
-    'U': 'U',
-    'D': 'D',
-    'L': 'L',
-    'R': 'R',
-    'F2': 'II_F',
-    'B2': 'II_B',
-    'U2': 'II_U',
-    'D2': 'II_D',
-    'L2': 'II_L',
-    'R2': 'II_R',
-    "F’": 'anti_F',
-    "B’": 'anti_B',
-    "U’": 'anti_U',
-    "D’": 'anti_D',
-    "L’": 'anti_L',
-    "R’": 'anti_R'
-}
+"""
+STATE / MOVE ENGINE:
+
+The cube is stored as one flat tuple of 54 stickers, face by face in the order of the board (top, left, front, right,
+back, bottom) and row by row inside every face, i.e. the sticker board[face][row][column] lives at the index
+face * 9 + row * 3 + column.
+
+Every move in POSSIBLE_MOVES is a precomputed index permutation of that tuple: the new sticker at index i is the old
+sticker at index permutation[i]. The permutations are generated once from the geometry of the cube: every sticker gets
+a 3D position (the cube is centered in the origin, coordinates are doubled to stay integers) and a face turn rotates
+all stickers of the turning layer by -90° around the outward normal of the face.
+
+Bigger (and smaller) cubes work the same way with N * N stickers per side, index (face * N + row) * N + column. Their
+moves (inner layers like 3R, wide turns like Rw or 3Rw) are generated once per size by move_permutations.
+"""
+
+# outward normal, row direction and column direction of every side in the order of the board
+FACE_GEOMETRY = [
+    # TOP SIDE (rows from back to front)
+    ((0, 1, 0), (0, 0, 1), (1, 0, 0)),
+    # LEFT SIDE (columns from back to front)
+    ((-1, 0, 0), (0, -1, 0), (0, 0, 1)),
+    # FRONT SIDE
+    ((0, 0, 1), (0, -1, 0), (1, 0, 0)),
+    # RIGHT SIDE (columns from front to back)
+    ((1, 0, 0), (0, -1, 0), (0, 0, -1)),
+    # BACK SIDE (seen through the cube from the front)
+    ((0, 0, -1), (0, -1, 0), (1, 0, 0)),
+    # BOTTOM SIDE (rows from front to back)
+    ((0, -1, 0), (0, 0, -1), (1, 0, 0))
+]
+
+# the side which is turned by a move, index in the board
+FACE_OF_MOVE = {'U': 0, 'L': 1, 'F': 2, 'R': 3, 'B': 4, 'D': 5}
+
+# whole cube rotations turn all layers like a side, the slices only the middle layer (cubes with an odd size)
+SIDE_OF_ROTATION = {'x': 'R', 'y': 'U', 'z': 'F'}
+SIDE_OF_SLICE = {'M': 'L', 'E': 'D', 'S': 'F'}
+
+
+def sticker_positions(size: int) -> list:
+    """
+    calculate the (doubled) 3D position of every sticker of the cube
+    :param size: number of stickers along one edge of the cube
+    :return: positions as (x, y, z) tuples in the order of the flat state
+    """
+    positions = []
+    for normal, row_direction, column_direction in FACE_GEOMETRY:
+        for row in range(size):
+            for column in range(size):
+                row_offset, column_offset = 2 * row - (size - 1), 2 * column - (size - 1)
+                positions.append(tuple(size * n + row_offset * r + column_offset * c
+                                       for n, r, c in zip(normal, row_direction, column_direction)))
+    return positions
+
+
+def layer_of(position: tuple, face: int, size: int) -> int:
+    """
+    find the layer of a sticker, counted from one side
+    :param position: (doubled) 3D position of the sticker, see sticker_positions
+    :param face: index of the side in the board
+    :param size: number of stickers along one edge of the cube
+    :return: 1 for the layer of the side itself, size for the layer of the opposite side
+    """
+    height = sum(p * a for p, a in zip(position, FACE_GEOMETRY[face][0]))
+    if height == size:
+        return 1  # sticker on the side itself
+    if height == -size:
+        return size  # sticker on the opposite side
+    return (size + 1 - height) // 2
+
+
+def _quarter_turn_permutation(face: int, size: int, layers: range = range(1, 2)) -> tuple:
+    """
+    create the index permutation of a clockwise quarter turn of some layers of one side
+    :param face: index of the side in the board
+    :param size: number of stickers along one edge of the cube
+    :param layers: turning layers, counted from the side (1 is the side itself)
+    :return: permutation, new_state[i] = old_state[permutation[i]]
+    """
+    axis = FACE_GEOMETRY[face][0]
+    positions = sticker_positions(size)
+    index_of_position = {position: index for index, position in enumerate(positions)}
+    permutation = list(range(len(positions)))
+
+    for index, position in enumerate(positions):
+        if layer_of(position, face, size) not in layers:
+            continue  # sticker is not in a turning layer
+        # rotation by -90° around the axis: v' = (a·v) a + v × a
+        x, y, z = position
+        ax, ay, az = axis
+        parallel = x * ax + y * ay + z * az
+        rotated = (parallel * ax + y * az - z * ay,
+                   parallel * ay + z * ax - x * az,
+                   parallel * az + x * ay - y * ax)
+        permutation[index_of_position[rotated]] = index
+    return tuple(permutation)
+
+
+def compose(first: tuple, second: tuple) -> tuple:
+    """
+    chain two permutations
+    :param first: permutation which is applied first
+    :param second: permutation which is applied afterwards
+    :return: permutation with the same effect as applying first and then second
+    """
+    return tuple(first[index] for index in second)
+
+
+def inverse_permutation(permutation: tuple) -> tuple:
+    """
+    :param permutation: new_state[i] = old_state[permutation[i]]
+    :return: the permutation which undoes it
+    """
+    inverse = [0] * len(permutation)
+    for index, source in enumerate(permutation):
+        inverse[source] = index
+    return tuple(inverse)
+
+
+def _build_move_permutations(size: int) -> dict:
+    permutations = {}
+    for move, face in FACE_OF_MOVE.items():
+        turns = {move: range(1, 2)}
+        for layer in range(2, size):
+            turns[f'{layer}{move}'] = range(layer, layer + 1)
+            turns[f'{layer}{move}w'] = range(1, layer + 1)
+        if size > 2:
+            turns[f'{move}w'] = turns[f'2{move}w']
+
+        for rotation in [rotation for rotation, side in SIDE_OF_ROTATION.items() if side == move]:
+            turns[rotation] = range(1, size + 1)
+        for middle in [middle for middle, side in SIDE_OF_SLICE.items() if side == move and size % 2]:
+            turns[middle] = range((size + 1) // 2, (size + 1) // 2 + 1)
+
+        for name, layers in turns.items():
+            quarter = _quarter_turn_permutation(face, size, layers)
+            permutations[name] = quarter
+            permutations[f'{name}2'] = compose(quarter, quarter)
+            permutations[f'{name}’'] = compose(permutations[f'{name}2'], quarter)
+    return permutations
+
+
+@lru_cache(maxsize=None)
+def move_permutations(size: int) -> dict:
+    """
+    create the permutation of every move of a cube with the given size, generated once per size (and saved in the
+    table cache, so other processes only load it):
+    R (the side), 2R .. {size - 1}R (a single inner layer) and Rw = 2Rw, 3Rw .. {size - 1}Rw (that many outer layers),
+    the rotations x y z and for odd sizes the slices M E S, each with the suffixes of POSSIBLE_MOVES (R, R2, R’)
+    :param size: number of stickers along one edge of the cube
+    :return: dictionary move -> permutation
+    """
+    sources = (size, FACE_GEOMETRY, FACE_OF_MOVE, SIDE_OF_ROTATION, SIDE_OF_SLICE,
+               code_sources(_build_move_permutations, _quarter_turn_permutation, layer_of, sticker_positions, compose))
+    return cached_table(f'move_permutations_{size}', sources, lambda: _build_move_permutations(size))
+
+
+@lru_cache(maxsize=None)
+def move_gathers(size: int) -> dict:
+    """
+    itemgetter applies a whole permutation to the state tuple in one C call
+    :param size: number of stickers along one edge of the cube
+    :return: dictionary move -> itemgetter of its permutation
+    """
+    return {move: itemgetter(*permutation) for move, permutation in move_permutations(size).items()}
+
+
+MOVE_PERMUTATIONS = {move: move_permutations(3)[move] for move in POSSIBLE_MOVES}
+
+IDENTITY = tuple(range(len(MOVE_PERMUTATIONS['F'])))
+
+# number of distinct texts kept by move_indices and of distinct normalized move strings kept by compile_moves
+COMPILE_CACHE_SIZE = 4096
+
+
+def normalize_moves(txt: str) -> str:
+    """
+    bring cube notation into the form of move_permutations, separated by single spaces (see notation)
+    :param txt: moves in WCA notation e.g. "(r') U2 3Rw [R, U]"
+    :return: normalized moves e.g. "Rw’ U2 3Rw R U R’ U’"
+    """
+    return ' '.join(parse_notation(txt))
+
+
+@lru_cache(maxsize=None)
+def move_names(size: int) -> tuple:
+    """
+    :param size: number of stickers along one edge of the cube
+    :return: the moves of move_permutations, the move of index i is move_names(size)[i]
+    """
+    return tuple(move_permutations(size))
+
+
+@lru_cache(maxsize=None)
+def _index_of_move(size: int) -> dict:
+    return {move: index for index, move in enumerate(move_names(size))}
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def _move_indices(txt: str, size: int) -> array:
+    index_of_move = _index_of_move(size)
+    try:
+        return array('H', [index_of_move[move] for move in parse_notation(txt)])
+    except KeyError:
+        for move, position in parse_notation_positions(txt):
+            if move not in index_of_move:
+                raise NotationError(f'Move unknown for the cube of size {size}', txt, position) from None
+        raise
+
+
+def move_indices(txt: str, size: int = 3) -> array:
+    """
+    parse a move sequence into the indices of its moves, the result is cached (LRU) by the text
+    :param txt: moves in WCA notation e.g. "R U R' U'", "(r U)2 [R: U] x"
+    :param size: number of stickers along one edge of the cube
+    :return: unsigned 16 bit array of indices into move_names(size)
+    """
+    return array('H', _move_indices(txt, size))  # a copy, the cached array stays as it is
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def _compile_normalized(moves: str, size: int) -> tuple:
+    gathers = move_gathers(size)  # gathers[move](permutation) = compose(permutation, move)
+    permutation = tuple(range(6 * size * size))
+    for move in moves.split():
+        permutation = gathers[move](permutation)
+    return permutation
+
+
+def _compile_text(txt: str, size: int) -> tuple:
+    try:
+        return _compile_normalized(' '.join(parse_notation(txt)), size)  # R U' and R U’ share one entry
+    except KeyError:
+        _move_indices(txt, size)  # NotationError with the position of the unknown move in the text
+        raise
+
+
+def compile_moves(txt: str, size: int = 3) -> tuple:
+    """
+    compile a whole move sequence into one sticker permutation, the result is cached (LRU) by the normalized moves
+    :param txt: moves in WCA notation e.g. "R U R’ U’"
+    :param size: number of stickers along one edge of the cube
+    :return: permutation with the effect of the whole sequence, new_state[i] = old_state[permutation[i]]
+    """
+    return _compile_text(txt, size)
+
+
+def compile_sources() -> tuple:
+    """
+    :return: the code of compile_moves and of the parser, a source of the tables which are built with compile_moves
+             (see table_cache)
+    """
+    return notation_sources(), code_sources(compile_moves, _compile_text, _compile_normalized.__wrapped__,
+                                            _move_indices.__wrapped__, normalize_moves)
+
+
+# quarter turns of a move, by the suffix of the move in POSSIBLE_MOVES
+QUARTER_TURNS = {'': 1, '2': 2, '’': 3}
+SUFFIX_OF_QUARTER_TURNS = {turns: suffix for suffix, turns in QUARTER_TURNS.items()}
+
+# opposite sides turn around the same axis, so their moves commute (e.g. R L = L R)
+AXIS_OF_FACE = {move: FACE_GEOMETRY[face][0].index(next(n for n in FACE_GEOMETRY[face][0] if n))
+                for move, face in FACE_OF_MOVE.items()}
+AXIS_OF_FACE.update({move: AXIS_OF_FACE[side] for move, side in {**SIDE_OF_ROTATION, **SIDE_OF_SLICE}.items()})
+
+
+def cancel_moves(moves: list) -> list:
+    """
+    merge and cancel redundant turns, e.g. R R -> R2, R R’ -> nothing, R L R’ -> L
+    :param moves: moves of POSSIBLE_MOVES
+    :return: shorter list of moves with the same effect
+    """
+    stack = []  # [face, quarter turns]
+
+    for move in moves:
+        face, turns = move[0], QUARTER_TURNS[move[1:]]
+
+        if stack and stack[-1][0] == face:
+            position = -1
+        elif len(stack) > 1 and stack[-2][0] == face and AXIS_OF_FACE[stack[-1][0]] == AXIS_OF_FACE[face]:
+            position = -2  # the opposite side in between commutes with this move
+        else:
+            stack.append([face, turns])
+            continue
+
+        stack[position][1] = (stack[position][1] + turns) % 4
+        if stack[position][1] == 0:
+            del stack[position]
+
+    return [f'{face}{SUFFIX_OF_QUARTER_TURNS[turns]}' for face, turns in stack]
+
+
+def invert_moves(moves: list) -> list:
+    """
+    :param moves: moves of POSSIBLE_MOVES
+    :return: moves which undo them, e.g. R U2 F’ -> F U2 R’
+    """
+    return [inverse_move(move) for move in reversed(moves)]
+
+
+def split_move(move: str) -> tuple:
+    """
+    :param move: normalized move e.g. "R’", "3Rw2"
+    :return: turning layers and quarter turns e.g. ('R', 3), ('3Rw', 2)
+    """
+    if move[-1:] in ('2', '’'):
+        return move[:-1], QUARTER_TURNS[move[-1]]
+    return move, 1
+
+
+@lru_cache(maxsize=None)
+def inverse_move(move: str) -> str:
+    """
+    :param move: normalized move e.g. "R", "3Rw2"
+    :return: the move which undoes it e.g. "R’", "3Rw2"
+    """
+    layers, turns = split_move(move)
+    return layers + SUFFIX_OF_QUARTER_TURNS[4 - turns]
+
+
+@lru_cache(maxsize=None)
+def move_tokens(size: int) -> dict:
+    """
+    :param size: number of stickers along one edge of the cube
+    :return: dictionary move -> (turning layers, axis, quarter turns), e.g. "3Rw2" -> ('3Rw', 0, 2)
+    """
+    tokens = {}
+    for move in move_permutations(size):
+        layers, turns = split_move(move)
+        tokens[move] = layers, AXIS_OF_FACE[layers.strip('0123456789')[0]], turns
+    return tokens
 
 
 class CubeObj:
     NxNxN: int
     colour: bool
 
-    def __init__(self, NxNxN=3, colour=True) -> None:
+    def __init__(self, NxNxN=3, colour=True, lazy=False, history=False) -> None:
+        """
+        :param NxNxN: number of stickers along one edge of the cube
+        :param colour: True for colours, False for the letters of LETTER_BOARD (3x3x3 only)
+        :param lazy: if True moves are only collected (and cancelled against each other) until the state is read
+        :param history: if True every move is recorded and can be taken back with undo / undo_to
+        """
+        if NxNxN < 2: raise ValueError('A cube needs at least 2 stickers along every edge.')
+        if not colour and NxNxN != 3: raise ValueError('The letter board only exists for the 3x3x3 cube.')
         self._height = self._width = self._depth = NxNxN
-        self._board = COLOR_BOARD if colour else LETTER_BOARD
+        self._gathers = move_gathers(NxNxN)
+        self._tokens = move_tokens(NxNxN)
+        self._names = move_names(NxNxN)
+        if NxNxN == 3:
+            self._state = self._flatten(COLOR_BOARD if colour else LETTER_BOARD)
+        else:
+            self._state = tuple(side[1][1] for side in COLOR_BOARD for _ in range(NxNxN * NxNxN))
+        self.lazy = lazy
+        self._pending = []  # [turning layers, axis, quarter turns] of the moves not applied to the state yet
+        # what undoes each change: inverse moves (str) or inverse permutation (tuple), None without history
+        self._history = [] if history else None
 
     def __str__(self) -> str:
-        return str(np.array(self._board))
+        import numpy as np  # only for printing, importing numpy takes longer than everything else of the module
+        return str(np.array(self.board))
 
     def __len__(self) -> int:
-        return len(self._board)
+        return len(FACE_GEOMETRY)
+
+    @staticmethod
+    def _flatten(board: list) -> tuple:
+        return tuple(sticker for side in board for row in side for sticker in row)
 
     @property
     def board(self) -> list:
-        return self._board
+        state, stickers_per_side = self.state, self._width * self._height
+        return [[list(state[start:start + self._width])
+                 for start in range(side * stickers_per_side, (side + 1) * stickers_per_side, self._width)]
+                for side in range(len(FACE_GEOMETRY))]
 
     @board.setter
     def board(self, input_board: list) -> None:
@@ -166,133 +508,223 @@ class CubeObj:
         if len(input_board) != 6: raise ValueError('Len fo Board has to be 6.')
 
         for item in input_board:
-            if len(item) != 3:
-                raise ValueError('The length of the Items in board must be 3.')
+            if len(item) != self._height:
+                raise ValueError(f'The length of the Items in board must be {self._height}.')
+            for row in item:
+                if len(row) != self._width:
+                    raise ValueError(f'The length of the rows in board must be {self._width}.')
+
+        self._pending.clear()
+        self._state = self._flatten(input_board)
+        if self._history is not None:
+            self._history.clear()  # a new board is not a move, the history starts again
 
-        self._board = input_board
+    @property
+    def state(self) -> tuple:
+        """
+        flat sticker state, board[face][row][column] is state[(face * N + row) * N + column] (N = NxNxN)
+        """
+        if self._pending:
+            self._materialize()
+        return self._state
+
+    @state.setter
+    def state(self, input_state) -> None:
+        input_state = tuple(input_state)
+        if len(input_state) != len(self._state): raise ValueError(f'State has to contain {len(self._state)} stickers.')
+        self._pending.clear()
+        self._state = input_state
+        if self._history is not None:
+            self._history.clear()  # a new state is not a move, the history starts again
+
+    def _push(self, token: tuple) -> None:
+        """
+        collect a move of a lazy cube, it merges with an earlier move of the same layers if only moves around the
+        same axis (which commute with it) lie in between, e.g. R L R’ -> L
+        :param token: turning layers, axis and quarter turns of the move (see move_tokens)
+        """
+        layers, axis, turns = token
+        pending = self._pending
+        for position in range(len(pending) - 1, -1, -1):
+            entry = pending[position]
+            if entry[1] != axis:
+                break
+            if entry[0] == layers:
+                entry[2] = (entry[2] + turns) % 4
+                if entry[2] == 0:
+                    del pending[position]
+                return
+        pending.append([layers, axis, turns])
+
+    def _materialize(self) -> None:
+        """
+        apply the collected moves of a lazy cube to the sticker state
+        """
+        state = self._state
+        for layers, _, turns in self._pending:
+            state = self._gathers[layers + SUFFIX_OF_QUARTER_TURNS[turns]](state)
+        self._state = state
+        self._pending.clear()
+
+    def clone(self) -> 'CubeObj':
+        """
+        independent copy of the cube, the (immutable) state is shared, only the pending moves and the history are copied
+        """
+        copy = object.__new__(type(self))
+        copy.__dict__.update(self.__dict__)
+        copy._pending = [list(entry) for entry in self._pending]
+        copy._history = None if self._history is None else list(self._history)
+        return copy
+
+    def __copy__(self) -> 'CubeObj':
+        return self.clone()
+
+    def __deepcopy__(self, memo: dict) -> 'CubeObj':
+        return self.clone()  # the move tables are shared between all cubes of a size and never change
+
+    def mark(self) -> int:
+        """
+        :return: position in the history, undo_to(mark) goes back to the cube of this moment
+        """
+        if self._history is None: raise ValueError('The cube has no history, create it with history=True.')
+        return len(self._history)
+
+    def undo(self) -> None:
+        """
+        take back the last move, translate or apply_permutation by applying its inverse
+        """
+        if not self._history: raise ValueError('Nothing to undo.')
+        inverse = self._history.pop()
+        if isinstance(inverse, tuple):
+            self._state = itemgetter(*inverse)(self.state)
+        elif self.lazy:
+            for move in inverse.split():
+                self._push(self._tokens[move])
+        elif inverse in self._gathers:
+            self._state = self._gathers[inverse](self._state)
+        else:
+            self._state = itemgetter(*compile_moves(inverse, self._width))(self._state)
+
+    def undo_to(self, mark: int) -> None:
+        """
+        take back everything done since mark() returned this position
+        :param mark: result of mark
+        """
+        if not 0 <= mark <= self.mark(): raise ValueError(f'Mark out of range: {mark}.')
+        while len(self._history) > mark:
+            self.undo()
+
+    def encode(self) -> int:
+        """
+        compact code of the 3x3x3 cube (corner and edge permutation and orientation), see encoding
+        """
+        from encoding import encode_state  # encoding imports this module
+        if self._width != 3: raise ValueError('Only the 3x3x3 cube can be encoded.')
+        return encode_state(self.state)
+
+    def key(self) -> bytes:
+        """
+        the code as 9 byte key, hashable and sortable, for sets and dictionaries of cubes
+        """
+        from encoding import to_key
+        return to_key(self.encode())
+
+    @classmethod
+    def decode(cls, code, colour: bool = True) -> 'CubeObj':
+        """
+        create the 3x3x3 cube of a code
+        :param code: result of encode (int) or key (bytes)
+        :param colour: True for a cube with colours, False for letters
+        :return: new cube
+        """
+        from encoding import decode, from_key, to_permutation
+        my_cube = cls(3, colour)
+        my_cube.apply_permutation(to_permutation(decode(from_key(code) if isinstance(code, bytes) else code)))
+        return my_cube
 
     # !!! THIS IS NOT A @staticmethod  OR FUNCTION IT IS A METHOD !!!!
     def translate(self, txt: str) -> None:
         """
-        translate cube notation into function names, and call them
+        translate cube notation (see notation) into one compiled permutation, and apply it
         """
-        new_txt = txt.upper().replace("'", "’").replace('(', '').replace('(', '')  # (r') -> R’
+        indices = _move_indices(txt, self._width)  # NotationError with the position of a mistake
+        if self.lazy:
+            for index in indices:
+                self._push(self._tokens[self._names[index]])
+        else:
+            self._state = itemgetter(*_compile_text(txt, self._width))(self._state)
+        if self._history is not None:
+            self._history.append(' '.join(invert_moves([self._names[index] for index in indices])))
+
+    def apply_permutation(self, permutation: tuple) -> None:
+        """
+        apply a permutation of the flat state e.g. the result of compile_moves
+        :param permutation: new_state[i] = old_state[permutation[i]]
+        """
+        if instrumentation.enabled and instrumentation.current_record() is not None:
+            instrumentation.current_record().permutations_applied += 1
+        self._state = itemgetter(*permutation)(self.state)
+        if self._history is not None:
+            self._history.append(inverse_permutation(permutation))
 
-        for instruction in new_txt.split():
-            exec(f"self.{TRANSLATION_DICTIONARY[instruction]}()")
+    def move(self, move: str) -> None:
+        """
+        apply a single move with one gather of the sticker state
+        :param move: move in normalized cube notation e.g. "R’", "3R2" or "Rw" (see move_permutations)
+        """
+        if self.lazy:
+            self._push(self._tokens[move])
+        else:
+            self._state = self._gathers[move](self._state)
+        if self._history is not None:
+            self._history.append(inverse_move(move))
 
     def F(self) -> None:
         """
         Rotation of the front side by 90 ° clockwise. (blue side)
         """
-        # get the current state of the cube
-        white_row = self._board[0][self._depth - 1]
-        orange_row = [item[0] for item in self._board[3]]
-        yellow_row = self._board[5][0]
-        red_row = [item[self._depth - 1] for item in self._board[1]]
-
-        # update the cube by rotating the blue face clockwise by 90°
-        self._board[0][2] = red_row[::-1]
-        for index in range(len(white_row)): self._board[3][index][0] = white_row[index]
-        self._board[5][0] = orange_row[::-1]
-        for index in range(len(yellow_row)): self._board[1][index][self._depth - 1] = yellow_row[index]
-        self._board[2] = np.rot90(np.array(self._board[2]), 3).tolist()
+        self.move('F')
 
     def B(self) -> None:
         """
         Rotation of the back side by 90 ° clockwise. (green side)
         """
-        # get the current state of the cube
-        white_row = self._board[0][0][::-1]
-        orange_row = [item[self._depth - 1] for item in self._board[3]]
-        yellow_row = self._board[5][self._depth - 1][::-1]
-        red_row = [item[0] for item in self._board[1]]
-
-        # update the cube by rotating the green face clockwise by 90°
-        self._board[0][0] = orange_row
-        for index in range(len(yellow_row)): self._board[3][index][self._depth - 1] = yellow_row[index]
-        self._board[5][self._depth - 1] = red_row
-        for index in range(len(white_row)): self._board[1][index][0] = white_row[index]
-        self._board[4] = np.rot90(np.array(self._board[4]), 1).tolist()
+        self.move('B')
 
     def R(self) -> None:
         """
         Rotation of the right side by 90 ° clockwise. (orange side)
         """
-        # get the current state of the cube
-        white_row = [item[self._width - 1] for item in self._board[0]][::-1]
-        green_row = [item[self._width - 1] for item in self._board[4]][::-1]
-        yellow_row = [item[self._width - 1] for item in self._board[5]]
-        blue_row = [item[self._width - 1] for item in self._board[2]]
-
-        # update the cube by rotating the orange face clockwise by 90°
-        for index in range(len(blue_row)): self._board[0][index][self._width - 1] = blue_row[index]
-        for index in range(len(white_row)): self._board[4][index][self._width - 1] = white_row[index]
-        for index in range(len(green_row)): self._board[5][index][self._width - 1] = green_row[index]
-        for index in range(len(yellow_row)): self._board[2][index][self._width - 1] = yellow_row[index]
-        self._board[3] = np.rot90(np.array(self._board[3]), 3).tolist()
+        self.move('R')
 
     def L(self) -> None:
         """
         Rotating the left side by 90° clockwise. (red side)
         """
-        # get the current state of the cube
-        white_row = [item[0] for item in self._board[0]]
-        blue_row = [item[0] for item in self._board[2]]
-        yellow_row = [item[0] for item in self._board[5]][::-1]
-        green_row = [item[0] for item in self._board[4]][::-1]
-
-        # update the cube by rotating the red face clockwise by 90°
-        for index in range(len(green_row)): self._board[0][index][0] = green_row[index]
-        for index in range(len(white_row)): self._board[2][index][0] = white_row[index]
-        for index in range(len(blue_row)): self._board[5][index][0] = blue_row[index]
-        for index in range(len(yellow_row)): self._board[4][index][0] = yellow_row[index]
-        self._board[1] = np.rot90(np.array(self._board[1]), 3).tolist()
+        self.move('L')
 
     def U(self) -> None:
         """
         Rotating the top side by 90° clockwise. (white side)
         """
-        # get the current state of the cube
-        blue_row = self._board[2][0]
-        red_row = self._board[1][0]
-        green_row = self._board[4][0]
-        orange_row = self._board[3][0]
-
-        # update the cube by rotating the white face clockwise by 90°
-        self._board[2][0] = orange_row
-        self._board[1][0] = blue_row
-        self._board[4][0] = red_row[::-1]
-        self._board[3][0] = green_row[::-1]
-        self._board[0] = np.rot90(np.array(self._board[0]), 3).tolist()
+        self.move('U')
 
     def D(self) -> None:
         """
         Rotating the down side by 90° clockwise. (yellow side)
         """
-        # get the current state of the cube
-        blue_row = self._board[2][self._height - 1]
-        red_row = self._board[1][self._height - 1]
-        green_row = self._board[4][self._height - 1]
-        orange_row = self._board[3][self._height - 1]
-
-        # update the cube by rotating the yellow face clockwise by 90°
-        self._board[2][self._height - 1] = red_row
-        self._board[3][self._height - 1] = blue_row
-        self._board[4][self._height - 1] = orange_row[::-1]
-        self._board[1][self._height - 1] = green_row[::-1]
-        self._board[5] = np.rot90(np.array(self._board[5]), 3).tolist()
-
-    def II_F(self) -> None: [self.F() for _ in range(2)]
-    def II_B(self) -> None: [self.B() for _ in range(2)]
-    def II_R(self) -> None: [self.R() for _ in range(2)]
-    def II_L(self) -> None: [self.L() for _ in range(2)]
-    def II_U(self) -> None: [self.U() for _ in range(2)]
-    def II_D(self) -> None: [self.D() for _ in range(2)]
-
-    def anti_F(self) -> None: [self.F() for _ in range(3)]
-    def anti_B(self) -> None: [self.B() for _ in range(3)]
-    def anti_R(self) -> None: [self.R() for _ in range(3)]
-    def anti_L(self) -> None: [self.L() for _ in range(3)]
-    def anti_U(self) -> None: [self.U() for _ in range(3)]
-    def anti_D(self) -> None: [self.D() for _ in range(3)]
+        self.move('D')
+
+    def II_F(self) -> None: self.move('F2')
+    def II_B(self) -> None: self.move('B2')
+    def II_R(self) -> None: self.move('R2')
+    def II_L(self) -> None: self.move('L2')
+    def II_U(self) -> None: self.move('U2')
+    def II_D(self) -> None: self.move('D2')
+
+    def anti_F(self) -> None: self.move('F’')
+    def anti_B(self) -> None: self.move('B’')
+    def anti_R(self) -> None: self.move('R’')
+    def anti_L(self) -> None: self.move('L’')
+    def anti_U(self) -> None: self.move('U’')
+    def anti_D(self) -> None: self.move('D’')
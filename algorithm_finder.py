@@ -0,0 +1,254 @@
+"""
+Rubik's Cube Solver
+Copyright (C) 2021  Felix Drees
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+How to contact me by electronic and/or paper mail:
+  https://github.com/felix-drees
+"""
+
+"""
+ALGORITHM FINDER:
+
+Short move sequences with a given effect (a sticker permutation, e.g. "swap the buffer with the target, everything else
+stays" of a swap algorithm), two searches:
+
+Meet in the middle: a sequence A B of length a + b has the effect T if A = T * B' is a cube of depth a. The cubes up to
+the half depth are the levels of state_space (built once on disk and shared by all queries), the cubes of depth b are
+multiplied with T and looked up in the sorted keys of depth a. The first length with a hit is the shortest sequence.
+
+Conjugates: S X S’ for every setup S up to the setup depth and every known algorithm X (the perms of old_pochmann and
+their inverses), the moves at the borders are cancelled. This finds longer sequences the half depth does not reach.
+
+regenerate_swap_tables searches both swap tables of old_pochmann (and the parity algorithm) and keeps the shorter
+sequence of every entry, the effects and so the solutions stay the same. The entries of the buffers (b / m and
+A / E / Q) do not exist, a buffer can not be swapped with itself.
+
+EXAMPLE OF USE:
+
+finder = AlgorithmFinder(half_depth=5)
+print(finder.find(T_PERM))  # a shortest sequence with the effect of the T-Perm
+print(finder.find(f"U' {T_PERM} U"))  # the effect can be given as moves ...
+print(finder.find(compile_moves("R U R' U'")))  # ... or as permutation
+
+centers, corners, parity = regenerate_swap_tables(finder)
+
+python3 algorithm_finder.py --half-depth 6 --setup-depth 4  # prints both tables
+"""
+
+from Cube import POSSIBLE_MOVES, cancel_moves, compile_moves, compose, inverse_permutation, invert_moves, \
+    normalize_moves
+from cubie import from_face_codes
+from encoding import KEY_BYTES, decode_keys, encode_cubies
+from old_pochmann import COMPILED_R_PERM, COMPILED_SWAP_CENTER, COMPILED_SWAP_CORNER, J_PERM_DOWN, J_PERM_UP, \
+    MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CENTER, MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CORNER, R_PERM, T_PERM, Y_PERM
+from state_space import ALLOWED_MOVES, MERGE_BLOCK, NO_MOVE, RECORD, StateSpace, enumerate_states
+from table_cache import CACHE_DIRECTORY
+from typing import Callable, Iterator, Union
+import argparse
+import numpy as np
+import os
+
+
+# the state space which is shared by all finders, see state_space
+STATE_SPACE_DIRECTORY = os.path.join(CACHE_DIRECTORY, 'state_space')
+
+# algorithms which are conjugated with the setups
+KNOWN_ALGORITHMS = (T_PERM, Y_PERM, J_PERM_UP, J_PERM_DOWN, R_PERM)
+
+
+def _effect_of(effect: Union[str, tuple]) -> tuple:
+    """
+    :param effect: moves in cube notation or a permutation (see compile_moves)
+    :return: the permutation
+    """
+    return compile_moves(effect) if isinstance(effect, str) else tuple(effect)
+
+
+def setups(depth: int) -> Iterator:
+    """
+    :param depth: maximal number of moves
+    :return: every sequence of POSSIBLE_MOVES up to the depth without two moves of the same side in a row and with
+             only one order of two opposite sides (see state_space.ALLOWED_MOVES), the empty one first
+    """
+    def extend(moves: list, last: int) -> Iterator:
+        yield moves
+        if len(moves) < depth:
+            for move in np.nonzero(ALLOWED_MOVES[last])[0]:
+                yield from extend(moves + [POSSIBLE_MOVES[move]], move)
+
+    return extend([], NO_MOVE)
+
+
+class AlgorithmFinder:
+    """
+    searches short move sequences for given effects, the tables are shared by all queries
+    """
+
+    def __init__(self, half_depth: int = 5, setup_depth: int = 3, algorithms: tuple = KNOWN_ALGORITHMS,
+                 path: str = STATE_SPACE_DIRECTORY, progress: Callable = None) -> None:
+        """
+        :param half_depth: depth of the state space, the meet in the middle search finds sequences up to twice as long
+        :param setup_depth: maximal length of the setups of the conjugates
+        :param algorithms: known algorithms which are conjugated with the setups
+        :param path: directory of the state space (enumerated up to half_depth if it is not deep enough yet)
+        :param progress: see enumerate_states
+        """
+        enumerate_states(path, half_depth, progress=progress)
+        self.space = StateSpace(path)
+        self.half_depth = half_depth
+        self.setup_depth = setup_depth
+        self._keys = {}  # depth -> sorted keys of the level, loaded once
+        self._algorithms = {}  # permutation -> shortest known algorithm with this effect
+        for algorithm in algorithms:
+            moves = cancel_moves(normalize_moves(algorithm).split())
+            for candidate in (moves, invert_moves(moves)):
+                permutation = compile_moves(' '.join(candidate))
+                if len(self._algorithms.get(permutation, candidate)) >= len(candidate):
+                    self._algorithms[permutation] = candidate
+
+    def _level_keys(self, depth: int) -> np.ndarray:
+        if depth not in self._keys:
+            self._keys[depth] = np.ascontiguousarray(self.space.level(depth)['key'])
+        return self._keys[depth]
+
+    def search(self, effects: list, max_length: int = None) -> list:
+        """
+        meet in the middle search for many effects at once, every level is read once for all of them
+        :param effects: moves or permutations, see _effect_of
+        :param max_length: longest sequence, at most twice the half depth
+        :return: a shortest sequence of every effect (list of moves), None if it is longer than max_length
+        """
+        max_length = 2 * self.half_depth if max_length is None else min(max_length, 2 * self.half_depth)
+        targets = []
+        for effect in effects:
+            cubie = from_face_codes([source // 9 for source in _effect_of(effect)])
+            targets.append((np.array(cubie.cp), np.array(cubie.co), np.array(cubie.ep), np.array(cubie.eo)))
+        results = [None] * len(targets)
+
+        for length in range(max_length + 1):
+            pending = [index for index, result in enumerate(results) if result is None]
+            if not pending:
+                break
+            backward, forward = length // 2, length - length // 2  # the smaller level is read, the larger looked up
+            keys = self._level_keys(forward)
+            level = self.space.level(backward)
+            for start in range(0, len(level), MERGE_BLOCK):
+                cp, co, ep, eo = decode_keys(np.ascontiguousarray(level[start:start + MERGE_BLOCK]['key'])
+                                             .view(np.uint8).reshape(-1, KEY_BYTES))
+                for index in pending:
+                    if results[index] is not None:
+                        continue
+                    # target * cube, see cubie.multiply
+                    target_cp, target_co, target_ep, target_eo = targets[index]
+                    products = encode_cubies(target_cp[cp], (target_co[cp] + co) % 3,
+                                             target_ep[ep], (target_eo[ep] + eo) % 2).view(RECORD['key']).ravel()
+                    found = np.minimum(np.searchsorted(keys, products), len(keys) - 1)
+                    hits = np.nonzero(keys[found] == products)[0]
+                    if len(hits):
+                        hit = int(hits[0])
+                        results[index] = self.space.moves(forward, int(found[hit])) + \
+                            invert_moves(self.space.moves(backward, start + hit))
+        return results
+
+    def conjugate(self, effects: list) -> list:
+        """
+        shortest S X S’ of a setup S (up to the setup depth) and a known algorithm X for many effects at once
+        :param effects: moves or permutations, see _effect_of
+        :return: the moves (cancelled at the borders) for every effect, None if there is no such conjugate
+        """
+        targets = [_effect_of(effect) for effect in effects]
+        results = [None] * len(targets)
+        for setup in setups(self.setup_depth):
+            setup_permutation = compile_moves(' '.join(setup))
+            undo_setup = inverse_permutation(setup_permutation)
+            for index, target in enumerate(targets):
+                # S X S’ = target  <=>  X = S’ target S
+                algorithm = self._algorithms.get(compose(compose(undo_setup, target), setup_permutation))
+                if algorithm is not None:
+                    moves = cancel_moves(setup + algorithm + invert_moves(setup))
+                    if results[index] is None or len(moves) < len(results[index]):
+                        results[index] = moves
+        return results
+
+    def find_many(self, effects: list, max_length: int = None) -> list:
+        """
+        :param effects: moves or permutations, see _effect_of
+        :param max_length: see search
+        :return: the shorter result of search and conjugate for every effect, None if both found nothing
+        """
+        found = []
+        for shortest, conjugated in zip(self.search(effects, max_length), self.conjugate(effects)):
+            candidates = [moves for moves in (shortest, conjugated) if moves is not None]
+            found.append(min(candidates, key=len) if candidates else None)
+        return found
+
+    def find(self, effect: Union[str, tuple], max_length: int = None) -> list:
+        """
+        :param effect: moves or permutation, see _effect_of
+        :param max_length: see search
+        :return: a short sequence with the effect (list of moves), None if nothing was found
+        """
+        return self.find_many([effect], max_length)[0]
+
+
+def _text(moves: list) -> str:
+    return ' '.join(moves).replace('’', "'")  # the notation of the tables in old_pochmann
+
+
+def regenerate_swap_tables(finder: AlgorithmFinder) -> tuple:
+    """
+    search shorter algorithms with the same effects for the swap tables of old_pochmann
+    :param finder: algorithm finder
+    :return: the tables of the center (edge) and corner targets and the parity algorithm, every entry is the shorter
+             of the found and the current algorithm
+    """
+    current = [*MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CENTER.values(),
+               *MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CORNER.values(), R_PERM]
+    effects = [*COMPILED_SWAP_CENTER.values(), *COMPILED_SWAP_CORNER.values(), COMPILED_R_PERM]
+    algorithms = []
+    for algorithm, found in zip(current, finder.find_many(effects)):
+        algorithm = cancel_moves(normalize_moves(algorithm).split())
+        algorithms.append(_text(found if found is not None and len(found) < len(algorithm) else algorithm))
+
+    centers = dict(zip(MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CENTER, algorithms))
+    corners = dict(zip(MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CORNER, algorithms[len(centers):]))
+    return centers, corners, algorithms[-1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='search shorter algorithms for the swap tables of old_pochmann')
+    parser.add_argument('--half-depth', type=int, default=6)
+    parser.add_argument('--setup-depth', type=int, default=4)
+    parser.add_argument('--path', default=STATE_SPACE_DIRECTORY, help='directory of the state space')
+    arguments = parser.parse_args()
+
+    finder = AlgorithmFinder(arguments.half_depth, arguments.setup_depth, path=arguments.path)
+    centers, corners, parity = regenerate_swap_tables(finder)
+    before = sum(len(normalize_moves(algorithm).split()) for algorithm in [
+        *MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CENTER.values(), *MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CORNER.values(),
+        R_PERM])
+    after = sum(len(algorithm.split()) for algorithm in [*centers.values(), *corners.values(), parity])
+    print(f'# {before} -> {after} moves')
+    for name, table in (('MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CENTER', centers),
+                        ('MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CORNER', corners)):
+        print(f'{name} = {{')
+        print(',\n'.join(f'    {letter!r}: "{algorithm}"' for letter, algorithm in table.items()))
+        print('}')
+    print(f'R_PERM = "{parity}"')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Rubik's Cube Solver
+Copyright (C) 2021  Felix Drees
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+How to contact me by electronic and/or paper mail:
+  https://github.com/felix-drees
+"""
+
+"""
+EXAMPLE OF USE:
+
+cubes = BatchCube(1_000_000)
+
+# the same moves on every cube ...
+cubes.apply("R U R' U'")
+
+# ... or one move per cube (indices in POSSIBLE_MOVES)
+cubes.apply_per_row(np.random.randint(len(POSSIBLE_MOVES), size=len(cubes)))
+
+print(cubes.is_solved().sum())
+"""
+
+from Cube import CubeObj, POSSIBLE_MOVES, MOVE_PERMUTATIONS, COLOR_BOARD, LETTER_BOARD, compile_moves
+from encoding import encode_codes
+from validation import VALID, validate_codes
+from typing import Iterable, Union
+import numpy as np
+
+
+# every sticker is stored as the index of the side it belongs to, i.e. as the index of its colour in COLOURS
+COLOURS = tuple(side[1][1] for side in COLOR_BOARD)
+
+CODE_OF_COLOUR = {colour: code for code, colour in enumerate(COLOURS)}
+CODE_OF_LETTER = {letter: code for code, side in enumerate(LETTER_BOARD) for row in side for letter in row}
+
+SOLVED_STATE = np.repeat(np.arange(len(COLOURS), dtype=np.uint8), len(MOVE_PERMUTATIONS['F']) // len(COLOURS))
+
+# row i is the permutation of POSSIBLE_MOVES[i]
+MOVE_TABLE = np.array([MOVE_PERMUTATIONS[move] for move in POSSIBLE_MOVES], dtype=np.intp)
+
+INDEX_OF_MOVE = {move: index for index, move in enumerate(POSSIBLE_MOVES)}
+
+
+class BatchCube:
+    """
+    N cubes as one (N, 54) uint8 array, every move is applied to all cubes with one NumPy gather
+    """
+
+    def __init__(self, size: int = 1, states: np.ndarray = None) -> None:
+        if states is None:
+            states = np.tile(SOLVED_STATE, (size, 1))
+        states = np.array(states, dtype=np.uint8)  # own copy, the old states are reused as buffer by the gathers
+        if states.ndim != 2 or states.shape[1] != SOLVED_STATE.size:
+            raise ValueError(f'States have to be of shape (N, {SOLVED_STATE.size}).')
+
+        self._states = states
+        self._buffer = np.empty_like(states)  # target of the next gather, swapped with the states afterwards
+        self._shared = False  # True while the caller holds the states, they are not reused as buffer then
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __getitem__(self, index) -> 'BatchCube':
+        return BatchCube(states=self._states[index].reshape(-1, SOLVED_STATE.size))
+
+    @property
+    def states(self) -> np.ndarray:
+        """
+        the states as read only (N, 54) array of side indices, later moves do not change it
+        """
+        self._shared = True
+        states = self._states.view()
+        states.flags.writeable = False
+        return states
+
+    def _swap(self) -> None:
+        """
+        the buffer holds the new states, the old states become the next buffer unless the caller holds them
+        """
+        self._states, self._buffer = self._buffer, None if self._shared else self._states
+        if self._buffer is None:
+            self._buffer = np.empty_like(self._states)
+        self._shared = False
+
+    @classmethod
+    def from_boards(cls, boards: Iterable, colour: bool = True) -> 'BatchCube':
+        """
+        create a batch from boards in the format of CubeObj.board
+        :param boards: nested [side][row][column] lists
+        :param colour: True if the boards contain colours, False if they contain the letters of LETTER_BOARD
+        :return: the batch
+        """
+        code_of = CODE_OF_COLOUR if colour else CODE_OF_LETTER
+        return cls(states=np.array([[code_of[sticker] for side in board for row in side for sticker in row]
+                                    for board in boards], dtype=np.uint8).reshape(-1, SOLVED_STATE.size))
+
+    @classmethod
+    def from_cubes(cls, cubes: Iterable, colour: bool = True) -> 'BatchCube':
+        """
+        create a batch from CubeObj instances
+        :param cubes: the cubes
+        :param colour: True if the cubes were created with colour=True
+        :return: the batch
+        """
+        code_of = CODE_OF_COLOUR if colour else CODE_OF_LETTER
+        return cls(states=np.array([[code_of[sticker] for sticker in cube.state] for cube in cubes],
+                                   dtype=np.uint8).reshape(-1, SOLVED_STATE.size))
+
+    def boards(self) -> list:
+        """
+        :return: the states in the format of CubeObj.board (colours)
+        """
+        return [cube.board for cube in self.to_cubes()]
+
+    def to_cubes(self) -> list:
+        """
+        :return: one CubeObj (colour=True) per row
+        """
+        cubes = []
+        for row in self._states:
+            cube = CubeObj(3, True)
+            cube.state = [COLOURS[code] for code in row]
+            cubes.append(cube)
+        return cubes
+
+    def apply(self, moves: Union[str, tuple]) -> None:
+        """
+        apply the same moves to every cube
+        :param moves: move sequence in cube notation or a permutation created by compile_moves
+        """
+        permutation = compile_moves(moves) if isinstance(moves, str) else moves
+        np.take(self._states, permutation, axis=1, out=self._buffer)
+        self._swap()
+
+    def apply_per_row(self, moves: Union[np.ndarray, Iterable]) -> None:
+        """
+        apply one move to every cube, the move may differ from row to row (e.g. for random walks)
+        :param moves: per row the index of the move in POSSIBLE_MOVES or the move itself
+        """
+        moves = np.asarray(moves)
+        if moves.dtype.kind in 'US':
+            moves = np.array([INDEX_OF_MOVE[move] for move in moves.tolist()], dtype=np.intp)
+        if moves.shape != (len(self._states),):
+            raise ValueError('One move per cube is needed.')
+
+        # group the rows by move, so that no (N, 54) index array has to be created
+        order = np.argsort(moves, kind='stable')
+        start = 0
+        for move, count in enumerate(np.bincount(moves, minlength=len(POSSIBLE_MOVES))):
+            if count:
+                rows = order[start:start + count]
+                self._buffer[rows] = np.take(self._states[rows], MOVE_TABLE[move], axis=1)
+                start += count
+        self._swap()
+
+    def is_solved(self) -> np.ndarray:
+        """
+        :return: boolean array, True for every solved cube
+        """
+        return (self._states == SOLVED_STATE).all(axis=1)
+
+    def is_solvable(self) -> np.ndarray:
+        """
+        :return: boolean array, False for every cube which can not be solved (see validation.validate_codes)
+        """
+        return validate_codes(self._states) == VALID
+
+    def equals(self, other: Union['BatchCube', np.ndarray]) -> np.ndarray:
+        """
+        compare the cubes row by row
+        :param other: batch of the same length, or a single state which is compared with every row
+        :return: boolean array, True for every row with the same state
+        """
+        other_states = other._states if isinstance(other, BatchCube) else np.asarray(other, dtype=np.uint8)
+        return (self._states == other_states).all(axis=1)
+
+    def keys(self) -> np.ndarray:
+        """
+        compact keys of all cubes, row i is CubeObj.key() of cube i (np.unique(keys, axis=0) drops duplicate cubes)
+        :return: (N, 9) uint8 array
+        """
+        return encode_codes(self._states)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+"""
+Rubik's Cube Solver
+Copyright (C) 2021  Felix Drees
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+How to contact me by electronic and/or paper mail:
+  https://github.com/felix-drees
+"""
+
+"""
+EXAMPLE OF USE:
+
+python3 benchmark.py --save baseline.json
+# ... change something ...
+python3 benchmark.py --baseline baseline.json --threshold 0.1   # exit code 1 if a benchmark got >10 % slower
+python3 benchmark.py --sizes 100 --kociemba 100   # exit code 1 if a random cube needs more than 24 moves or 10 s
+"""
+
+from Cube import CubeObj as Cube, POSSIBLE_MOVES
+from old_pochmann import create_scrambled_cube, solve_old_pochmann, trace_old_pochmann
+from time import perf_counter
+import argparse
+import json
+import random as rm
+import sys
+
+
+SEED = 2021
+SCRAMBLE_LENGTH = 25
+LONG_SEQUENCE_LENGTH = 200
+
+# micro benchmarks are timed in batches, otherwise the timer would be slower than the move itself
+MICRO_BATCH = 100
+
+
+def scramble_corpus(size: int, length: int = SCRAMBLE_LENGTH, seed: int = SEED) -> list:
+    """
+    create reproducible scrambles
+    :param size: number of scrambles
+    :param length: number of moves per scramble
+    :param seed: seed of the random generator
+    :return: list of scrambles in cube notation
+    """
+    generator = rm.Random(seed)
+    return [' '.join(generator.choices(POSSIBLE_MOVES, k=length)) for _ in range(size)]
+
+
+def measure(function, arguments: list, batch: int = 1) -> dict:
+    """
+    call the function for every argument and collect the latencies
+    :param function: function which is benchmarked
+    :param arguments: one call per argument
+    :param batch: number of calls which are timed together
+    :return: number of operations, operations per second, p50 and p99 latency in seconds
+    """
+    latencies = []
+    total = 0.0
+    for start in range(0, len(arguments), batch):
+        chunk = arguments[start:start + batch]
+        s_time = perf_counter()
+        for argument in chunk:
+            function(argument)
+        elapsed = perf_counter() - s_time
+        total += elapsed  # summed per chunk, a partial last chunk would get a wrong weight after sorting
+        latencies.append(elapsed / len(chunk))
+
+    latencies.sort()
+    return {
+        'ops': len(arguments),
+        'ops_per_s': len(arguments) / total if total else float('inf'),
+        'p50_s': latencies[len(latencies) // 2],
+        'p99_s': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    }
+
+
+def benchmark_face_turns(size: int) -> dict:
+    results = {}
+    for move_type, suffix in (('quarter', ''), ('half', '2'), ('prime', '’')):
+        cube = Cube(3, True)
+        moves = [f'{face}{suffix}' for face in 'FBUDLR'] * (size // 6 + 1)
+        results[f'face_turn_{move_type}'] = measure(cube.move, moves[:size], MICRO_BATCH)
+    return results
+
+
+def benchmark_translate(size: int) -> dict:
+    cube = Cube(3, True)
+    sequences = scramble_corpus(size, LONG_SEQUENCE_LENGTH, SEED + 1)
+    return {f'translate_{LONG_SEQUENCE_LENGTH}_moves': measure(cube.translate, sequences)}
+
+
+def benchmark_create_scrambled_cube(size: int) -> dict:
+    return {'create_scrambled_cube': measure(create_scrambled_cube, scramble_corpus(size))}
+
+
+def benchmark_solve(size: int) -> dict:
+    scrambles = scramble_corpus(size)
+    solve = measure(solve_old_pochmann, [create_scrambled_cube(scramble) for scramble in scrambles])
+    trace = measure(trace_old_pochmann, [create_scrambled_cube(scramble) for scramble in scrambles])
+    return {f'solve_old_pochmann_{size}': solve, f'trace_old_pochmann_{size}': trace}
+
+
+def check_kociemba(size: int, max_length: int = 24, timeout: float = 10.0) -> tuple:
+    """
+    solve uniformly random cubes with the two-phase solver
+    :param size: number of cubes
+    :param max_length: see solve_kociemba
+    :param timeout: see solve_kociemba
+    :return: the measurement and descriptions of the cubes which needed more than max_length moves or the whole timeout
+    """
+    from kociemba import solve_kociemba  # loads the tables of the two-phase solver, only needed here
+    from scrambler import create_uniform_scrambled_cube
+
+    solve_kociemba(Cube(3, True))  # the tables are loaded before the time is measured
+    failures = []
+
+    def solve(seed: int) -> None:
+        s_time = perf_counter()
+        moves = solve_kociemba(create_uniform_scrambled_cube(seed), max_length, timeout)
+        seconds = perf_counter() - s_time
+        if len(moves) > max_length or seconds >= timeout:
+            failures.append(f'solve_kociemba: cube of seed {seed} needed {len(moves)} moves and {seconds:.1f} s')
+
+    seeds = list(range(SEED, SEED + size))
+    return {f'solve_kociemba_{size}': measure(solve, seeds)}, failures
+
+
+def run_benchmarks(sizes: tuple = (1000, 10000)) -> dict:
+    """
+    run all benchmarks with fixed seeds
+    :param sizes: corpus sizes of the solver benchmarks
+    :return: benchmark name -> measurement
+    """
+    results = {}
+    results.update(benchmark_face_turns(100 * MICRO_BATCH))
+    results.update(benchmark_translate(min(sizes)))
+    results.update(benchmark_create_scrambled_cube(min(sizes)))
+    for size in sizes:
+        results.update(benchmark_solve(size))
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    compare the throughput with a saved baseline
+    :param results: result of run_benchmarks
+    :param baseline: saved result of run_benchmarks
+    :param threshold: allowed relative slowdown e.g. 0.1 for 10 %
+    :return: descriptions of the regressions
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        change = result['ops_per_s'] / baseline[name]['ops_per_s'] - 1
+        result['change'] = change
+        if change < -threshold:
+            regressions.append(f'{name}: {baseline[name]["ops_per_s"]:.1f} -> {result["ops_per_s"]:.1f} ops/s '
+                               f'({change:+.1%})')
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the cube and the solvers.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='corpus sizes of the solvers')
+    parser.add_argument('--kociemba', type=int, default=30,
+                        help='number of random cubes which the two-phase solver has to solve within 24 moves and the '
+                             'timeout, 0 to skip')
+    parser.add_argument('--save', help='write the results to this file')
+    parser.add_argument('--baseline', help='compare with the results in this file')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed slowdown compared to the baseline')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(tuple(args.sizes))
+    failures = []
+    if args.kociemba:
+        kociemba_results, failures = check_kociemba(args.kociemba)
+        results.update(kociemba_results)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            regressions = compare(results, json.load(file), args.threshold)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+    print(json.dumps(results, indent=2))
+
+    for regression in regressions:
+        print(f'REGRESSION {regression}', file=sys.stderr)
+    for failure in failures:
+        print(f'FAILED {failure}', file=sys.stderr)
+    return 1 if regressions or failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
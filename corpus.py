@@ -0,0 +1,376 @@
+"""
+Rubik's Cube Solver
+Copyright (C) 2021  Felix Drees
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+How to contact me by electronic and/or paper mail:
+  https://github.com/felix-drees
+"""
+
+"""
+BINARY CORPUS:
+
+Millions of records (a cube and a move sequence, e.g. a scramble and the cube it leads to, or a cube and its solution)
+in a directory of four files, every column is read with numpy.memmap without parsing or copying:
+
+corpus.json   format, version, state format and the number of records
+states.bin    fixed width state column, (N, 9) encoding keys ('key') or (N, 54) side indices ('stickers')
+moves.bin     all move sequences one after another, one byte per move (its index in POSSIBLE_MOVES)
+offsets.bin   (N + 1) int64, the moves of record i are moves.bin[offsets[i]:offsets[i + 1]]
+
+Records are appended at the end of the files, the count in corpus.json is written last. A corpus which was not closed
+(e.g. a killed job) keeps the records of its last flush, the rest is cut off when it is opened for appending again.
+
+EXAMPLE OF USE:
+
+text_to_corpus('scrambles.txt', 'scrambles.corpus')  # one scramble per line, as create_scrambled_cube accepts them
+
+corpus = Corpus('scrambles.corpus')
+print(len(corpus), corpus.scramble(0), corpus.cube(0))
+cubes = corpus.batch()  # BatchCube of all states ('stickers')
+
+with CorpusWriter('solutions.corpus', state_format='stickers') as writer:
+    writer.append("R U R' U'")  # the state is the scrambled cube
+    writer.append(solution_moves, state=my_cube)  # or any other cube
+"""
+
+from Cube import CubeObj as Cube, POSSIBLE_MOVES
+from batch_cube import BatchCube, CODE_OF_COLOUR, CODE_OF_LETTER, COLOURS, INDEX_OF_MOVE, MOVE_TABLE, SOLVED_STATE
+from encoding import KEY_BYTES, encode_codes
+from notation import parse_notation
+from typing import Iterable, Union
+import json
+import numpy as np
+import os
+
+
+FORMAT = 'rubiks-cube-corpus'
+VERSION = 1
+
+STATE_BYTES = {'key': KEY_BYTES, 'stickers': SOLVED_STATE.size}
+
+HEADER_FILE = 'corpus.json'
+STATES_FILE = 'states.bin'
+MOVES_FILE = 'moves.bin'
+OFFSETS_FILE = 'offsets.bin'
+
+# records kept in memory by CorpusWriter before they are written
+FLUSH_RECORDS = 65_536
+
+
+def _read_header(path: str) -> dict:
+    with open(os.path.join(path, HEADER_FILE), encoding='utf-8') as file:
+        header = json.load(file)
+    if header.get('format') != FORMAT or header.get('version') != VERSION:
+        raise ValueError(f'{path} is no corpus of version {VERSION}.')
+    if header.get('state_format') not in STATE_BYTES:
+        raise ValueError(f'Unknown state format: {header.get("state_format")}.')
+    return header
+
+
+def _write_header(path: str, state_format: str, count: int) -> None:
+    temporary = os.path.join(path, HEADER_FILE + '.tmp')
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump({'format': FORMAT, 'version': VERSION, 'state_format': state_format, 'count': count}, file)
+    os.replace(temporary, os.path.join(path, HEADER_FILE))  # readers see the old or the new count, nothing between
+
+
+def encode_moves(moves: Union[str, Iterable]) -> bytes:
+    """
+    :param moves: scramble in the text format of create_scrambled_cube, or moves of POSSIBLE_MOVES
+    :return: one byte per move, its index in POSSIBLE_MOVES
+    """
+    if isinstance(moves, str):
+        moves = parse_notation(moves)
+    try:
+        return bytes(INDEX_OF_MOVE[move] for move in moves)
+    except KeyError as error:
+        raise ValueError(f'Move unknown. UNKNOWN MOVE >>{error.args[0]}<<') from None
+
+
+def decode_moves(move_bytes) -> str:
+    """
+    :param move_bytes: moves as bytes or uint8 array, see encode_moves
+    :return: the moves as text, separated by spaces (accepted by create_scrambled_cube)
+    """
+    return ' '.join(POSSIBLE_MOVES[index] for index in bytes(move_bytes))
+
+
+def scramble_codes(move_bytes: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    scramble many solved cubes at once
+    :param move_bytes: all move sequences one after another, see encode_moves
+    :param offsets: (N + 1) start of every sequence in move_bytes, and the end of the last one
+    :return: (N, 54) uint8 array of side indices, the cubes after the sequences (the format of BatchCube)
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    move_bytes = np.asarray(move_bytes, dtype=np.uint8)
+    lengths = np.diff(offsets)
+    states = np.tile(SOLVED_STATE, (len(lengths), 1))
+
+    for step in range(int(lengths.max()) if len(lengths) else 0):
+        rows = np.flatnonzero(lengths > step)
+        moves = move_bytes[offsets[rows] + step]
+        # group the rows by move, one gather per move as in BatchCube.apply_per_row
+        order = np.argsort(moves, kind='stable')
+        start = 0
+        for move, count in enumerate(np.bincount(moves, minlength=len(POSSIBLE_MOVES))):
+            if count:
+                group = rows[order[start:start + count]]
+                states[group] = np.take(states[group], MOVE_TABLE[move], axis=1)
+                start += count
+    return states
+
+
+class CorpusWriter:
+    """
+    appends records to a new or existing corpus
+    """
+
+    def __init__(self, path: str, state_format: str = 'key') -> None:
+        """
+        :param path: directory of the corpus, created if it does not exist
+        :param state_format: 'key' (9 bytes, see encoding) or 'stickers' (54 side indices), only for a new corpus
+        """
+        self.path = path
+        if os.path.exists(os.path.join(path, HEADER_FILE)):
+            header = _read_header(path)
+            self.state_format, self._count = header['state_format'], header['count']
+        else:
+            if state_format not in STATE_BYTES: raise ValueError(f'Unknown state format: {state_format}.')
+            os.makedirs(path, exist_ok=True)
+            self.state_format, self._count = state_format, 0
+            np.zeros(1, dtype=np.int64).tofile(os.path.join(path, OFFSETS_FILE))
+            for name in (STATES_FILE, MOVES_FILE):
+                open(os.path.join(path, name), 'wb').close()
+            _write_header(path, state_format, 0)
+        self._state_bytes = STATE_BYTES[self.state_format]
+
+        # cut off what was written after the last header (an interrupted flush)
+        offsets = np.fromfile(os.path.join(path, OFFSETS_FILE), dtype=np.int64, count=self._count + 1)
+        self._end = int(offsets[-1])
+        self._files = {}
+        for name, size in ((STATES_FILE, self._count * self._state_bytes), (MOVES_FILE, self._end),
+                           (OFFSETS_FILE, (self._count + 1) * 8)):
+            self._files[name] = open(os.path.join(path, name), 'r+b')
+            self._files[name].truncate(size)
+            self._files[name].seek(size)
+
+        self._states, self._moves, self._lengths = [], [], []
+
+    def __len__(self) -> int:
+        return self._count + len(self._lengths)
+
+    def __enter__(self) -> 'CorpusWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _state_of(self, state) -> bytes:
+        """
+        :param state: CubeObj, or a state in the format of the corpus (bytes / array)
+        """
+        if isinstance(state, Cube):
+            if self.state_format == 'key':
+                return state.key()
+            code_of = CODE_OF_COLOUR if set(state.state) <= CODE_OF_COLOUR.keys() else CODE_OF_LETTER
+            return bytes(code_of[sticker] for sticker in state.state)
+        state = bytes(np.asarray(state, dtype=np.uint8).ravel()) if not isinstance(state, bytes) else state
+        if len(state) != self._state_bytes:
+            raise ValueError(f'A state of the format {self.state_format} has {self._state_bytes} bytes.')
+        return state
+
+    def append(self, moves: Union[str, Iterable], state=None) -> None:
+        """
+        append one record
+        :param moves: scramble in the text format of create_scrambled_cube, or moves of POSSIBLE_MOVES
+        :param state: CubeObj or state in the format of the corpus, default the solved cube after the moves
+        """
+        move_bytes = encode_moves(moves)
+        if state is None:
+            codes = scramble_codes(np.frombuffer(move_bytes, dtype=np.uint8), [0, len(move_bytes)])
+            state = encode_codes(codes)[0] if self.state_format == 'key' else codes[0]
+        self._states.append(self._state_of(state))
+        self._moves.append(move_bytes)
+        self._lengths.append(len(move_bytes))
+        if len(self._lengths) >= FLUSH_RECORDS:
+            self.flush()
+
+    def extend(self, sequences: Iterable, states: np.ndarray = None) -> None:
+        """
+        append many records at once, the states of scrambles are computed for all of them together
+        :param sequences: scrambles in the text format of create_scrambled_cube, or lists of moves
+        :param states: (N, state bytes) states in the format of the corpus, default the cubes after the moves
+        """
+        move_bytes = [encode_moves(moves) for moves in sequences]
+        if states is None:
+            offsets = np.concatenate([[0], np.cumsum([len(moves) for moves in move_bytes], dtype=np.int64)])
+            states = scramble_codes(np.frombuffer(b''.join(move_bytes), dtype=np.uint8), offsets)
+            if self.state_format == 'key':
+                states = encode_codes(states)
+        states = np.asarray(states, dtype=np.uint8)
+        if states.shape != (len(move_bytes), self._state_bytes):
+            raise ValueError(f'States have to be of shape ({len(move_bytes)}, {self._state_bytes}).')
+
+        self.flush()
+        self._write(states.tobytes(), b''.join(move_bytes), [len(moves) for moves in move_bytes])
+
+    def flush(self) -> None:
+        """
+        write the records kept in memory, afterwards they are visible to new readers
+        """
+        if self._lengths:
+            states, moves, lengths = b''.join(self._states), b''.join(self._moves), self._lengths
+            self._states, self._moves, self._lengths = [], [], []
+            self._write(states, moves, lengths)
+
+    def _write(self, states: bytes, moves: bytes, lengths: list) -> None:
+        if not lengths:
+            return
+        offsets = self._end + np.cumsum(lengths, dtype=np.int64)
+        self._files[STATES_FILE].write(states)
+        self._files[MOVES_FILE].write(moves)
+        self._files[OFFSETS_FILE].write(offsets.tobytes())
+        for file in self._files.values():
+            file.flush()
+        self._count += len(lengths)
+        self._end = int(offsets[-1])
+        _write_header(self.path, self.state_format, self._count)
+
+    def close(self) -> None:
+        if self._files:
+            self.flush()
+            for file in self._files.values():
+                file.close()
+            self._files = {}
+
+
+def _memmap(path: str, dtype, shape: tuple) -> np.ndarray:
+    if 0 in shape:
+        return np.empty(shape, dtype=dtype)  # numpy can not map an empty file
+    return np.memmap(path, dtype=dtype, mode='r', shape=shape)
+
+
+class Corpus:
+    """
+    read only view of a corpus, the columns are memory mapped
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param path: directory of the corpus, the records up to its last flush are visible
+        """
+        self.path = path
+        header = _read_header(path)
+        self.state_format = header['state_format']
+        count = header['count']
+
+        self.offsets = _memmap(os.path.join(path, OFFSETS_FILE), np.int64, (count + 1,))
+        self.states = _memmap(os.path.join(path, STATES_FILE), np.uint8, (count, STATE_BYTES[self.state_format]))
+        self.move_bytes = _memmap(os.path.join(path, MOVES_FILE), np.uint8, (int(self.offsets[-1]),))
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def moves(self, index: int) -> np.ndarray:
+        """
+        :return: the moves of a record as indices in POSSIBLE_MOVES (a view of the file)
+        """
+        if not -len(self) <= index < len(self): raise IndexError(f'Record out of range: {index}.')
+        index %= len(self)
+        return self.move_bytes[self.offsets[index]:self.offsets[index + 1]]
+
+    def scramble(self, index: int) -> str:
+        """
+        :return: the moves of a record as text, see decode_moves
+        """
+        return decode_moves(self.moves(index))
+
+    def cube(self, index: int) -> Cube:
+        """
+        :return: the state of a record as CubeObj (colour=True)
+        """
+        state = self.states[index]
+        if self.state_format == 'key':
+            return Cube.decode(bytes(state))
+        my_cube = Cube(3, True)
+        my_cube.state = [COLOURS[code] for code in state]
+        return my_cube
+
+    def batch(self, start: int = 0, stop: int = None) -> BatchCube:
+        """
+        :return: the states of the records start .. stop - 1 as BatchCube (only for the state format 'stickers')
+        """
+        if self.state_format != 'stickers': raise ValueError('Keys can not be turned into a BatchCube directly.')
+        return BatchCube(states=self.states[start:stop])
+
+    def __iter__(self):
+        """
+        :return: iterator of (state, moves), both views of the files
+        """
+        for index in range(len(self)):
+            yield self.states[index], self.move_bytes[self.offsets[index]:self.offsets[index + 1]]
+
+
+"""
+TEXT:
+"""
+
+
+def text_to_corpus(text_path: str, corpus_path: str, state_format: str = 'key', chunk: int = FLUSH_RECORDS) -> int:
+    """
+    convert a file with one scramble per line (empty lines are skipped) into a corpus, or append to one
+    :param state_format: see CorpusWriter
+    :param chunk: lines converted at once
+    :return: number of records written
+    """
+    written = 0
+    with CorpusWriter(corpus_path, state_format) as writer, open(text_path, encoding='utf-8') as file:
+        lines = []
+        for number, line in enumerate(file, 1):
+            if line.strip():
+                lines.append((number, line))
+            if len(lines) >= chunk:
+                written += _extend_lines(writer, lines)
+                lines = []
+        written += _extend_lines(writer, lines)
+    return written
+
+
+def _extend_lines(writer: CorpusWriter, lines: list) -> int:
+    try:
+        sequences = [parse_notation(line) for _, line in lines]
+        writer.extend(sequences)
+    except ValueError:
+        for number, line in lines:  # find the line for the message
+            try:
+                encode_moves(line)
+            except ValueError as error:
+                raise ValueError(f'Line {number}: {error}') from None
+        raise
+    return len(lines)
+
+
+def corpus_to_text(corpus_path: str, text_path: str) -> int:
+    """
+    write the moves of every record as one line of text, e.g. the scrambles back into the format of text_to_corpus
+    :return: number of lines written
+    """
+    corpus = Corpus(corpus_path)
+    with open(text_path, 'w', encoding='utf-8') as file:
+        for index in range(len(corpus)):
+            file.write(decode_moves(corpus.moves(index)) + '\n')
+    return len(corpus)
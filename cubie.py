@@ -0,0 +1,189 @@
+"""
+Rubik's Cube Solver
+Copyright (C) 2021  Felix Drees
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+How to contact me by electronic and/or paper mail:
+  https://github.com/felix-drees
+"""
+
+"""
+CUBIE LEVEL:
+
+Instead of 54 stickers the cube is described by its 8 corners and 12 edges:
+
+cp[i]: which corner is at corner position i, co[i]: its orientation (0, 1 or 2 clockwise twists)
+ep[i]: which edge is at edge position i,     eo[i]: its orientation (0 or 1)
+
+The orientation of a piece is 0 if its U/D sticker (for the edges FR, FL, BL, BR its F/B sticker) is on the U/D side
+(F/B side) of the cube. Multiplying two cubie cubes chains them: multiply(a, b) is a followed by b.
+"""
+
+from Cube import MOVE_PERMUTATIONS, POSSIBLE_MOVES, FACE_OF_MOVE, FACE_GEOMETRY, LETTER_BOARD, sticker_positions
+from typing import NamedTuple
+
+
+CORNER_NAMES = ['URF', 'UFL', 'ULB', 'UBR', 'DFR', 'DLF', 'DBL', 'DRB']
+EDGE_NAMES = ['UR', 'UF', 'UL', 'UB', 'DR', 'DF', 'DL', 'DB', 'FR', 'FL', 'BL', 'BR']
+
+
+_INDEX_OF_POSITION = {position: index for index, position in enumerate(sticker_positions(3))}
+
+
+def _facelets_of_piece(name: str) -> tuple:
+    """
+    find the stickers of a piece in the flat state
+    :param name: e.g. 'URF', the sides are listed clockwise starting with the reference side
+    :return: flat indices of the stickers in the order of the name
+    """
+    normals = [FACE_GEOMETRY[FACE_OF_MOVE[face]][0] for face in name]
+    center = [2 * sum(axis) for axis in zip(*normals)]  # the cubie lies at ±2 on the axes of its sides
+    return tuple(_INDEX_OF_POSITION[tuple(c + n for c, n in zip(center, normal))] for normal in normals)
+
+
+CORNER_FACELETS = [_facelets_of_piece(name) for name in CORNER_NAMES]
+EDGE_FACELETS = [_facelets_of_piece(name) for name in EDGE_NAMES]
+
+# sides of every piece (as index in the board), in the same order as the facelets
+CORNER_FACES = [tuple(FACE_OF_MOVE[face] for face in name) for name in CORNER_NAMES]
+EDGE_FACES = [tuple(FACE_OF_MOVE[face] for face in name) for name in EDGE_NAMES]
+
+_CORNER_OF_FACES = {faces: corner for corner, faces in enumerate(CORNER_FACES)}
+_EDGE_OF_FACES = {faces: edge for edge, faces in enumerate(EDGE_FACES)}
+_UP_DOWN = (FACE_OF_MOVE['U'], FACE_OF_MOVE['D'])
+
+_SIDE_OF_LETTER = {letter: side for side, rows in enumerate(LETTER_BOARD) for row in rows for letter in row}
+
+
+class CubieCube(NamedTuple):
+    cp: tuple
+    co: tuple
+    ep: tuple
+    eo: tuple
+
+
+SOLVED = CubieCube(tuple(range(8)), (0,) * 8, tuple(range(12)), (0,) * 12)
+
+
+def face_codes(state: tuple) -> list:
+    """
+    find the side every sticker belongs to
+    :param state: flat state of a 3x3x3 CubeObj (colours or letters)
+    :return: index of the side (in the board) for every sticker
+    """
+    center_of = {state[side * 9 + 4]: side for side in range(6)}
+    if len(center_of) == 6 and all(sticker in center_of for sticker in state):
+        return [center_of[sticker] for sticker in state]
+    try:
+        return [_SIDE_OF_LETTER[sticker] for sticker in state]
+    except KeyError as error:
+        raise ValueError(f'Unknown sticker >>{error.args[0]}<<.') from None
+
+
+def from_face_codes(codes: list) -> CubieCube:
+    """
+    create the cubie cube of a sticker state
+    :param codes: side index of every sticker, see face_codes
+    :return: the cubie cube
+    """
+    cp, co, ep, eo = [], [], [], []
+
+    for facelets in CORNER_FACELETS:
+        faces = [codes[index] for index in facelets]
+        for twist in range(3):
+            if faces[twist] in _UP_DOWN:
+                break
+        else:
+            raise ValueError(f'Corner without a U/D sticker: {faces}.')
+        corner = _CORNER_OF_FACES.get((faces[twist], faces[(twist + 1) % 3], faces[(twist + 2) % 3]))
+        if corner is None:
+            raise ValueError(f'Corner does not exist: {faces}.')
+        cp.append(corner)
+        co.append(twist)
+
+    for facelets in EDGE_FACELETS:
+        faces = tuple(codes[index] for index in facelets)
+        if faces in _EDGE_OF_FACES:
+            ep.append(_EDGE_OF_FACES[faces])
+            eo.append(0)
+        elif faces[::-1] in _EDGE_OF_FACES:
+            ep.append(_EDGE_OF_FACES[faces[::-1]])
+            eo.append(1)
+        else:
+            raise ValueError(f'Edge does not exist: {faces}.')
+
+    return CubieCube(tuple(cp), tuple(co), tuple(ep), tuple(eo))
+
+
+def from_state(state: tuple) -> CubieCube:
+    """
+    :param state: flat state of a 3x3x3 CubeObj (colours or letters)
+    :return: the cubie cube
+    """
+    return from_face_codes(face_codes(state))
+
+
+def to_face_codes(cubie: CubieCube) -> list:
+    """
+    :param cubie: cubie cube
+    :return: side index of every sticker
+    """
+    codes = [index // 9 for index in range(54)]  # centers
+    for position, facelets in enumerate(CORNER_FACELETS):
+        faces, twist = CORNER_FACES[cubie.cp[position]], cubie.co[position]
+        for offset, index in enumerate(facelets):
+            codes[index] = faces[(offset - twist) % 3]
+    for position, facelets in enumerate(EDGE_FACELETS):
+        faces, flip = EDGE_FACES[cubie.ep[position]], cubie.eo[position]
+        for offset, index in enumerate(facelets):
+            codes[index] = faces[(offset + flip) % 2]
+    return codes
+
+
+def multiply(first: CubieCube, second: CubieCube) -> CubieCube:
+    """
+    chain two cubie cubes
+    :param first: applied first
+    :param second: applied afterwards
+    :return: cubie cube with the effect of first and then second
+    """
+    return CubieCube(
+        tuple(first.cp[corner] for corner in second.cp),
+        tuple((first.co[corner] + twist) % 3 for corner, twist in zip(second.cp, second.co)),
+        tuple(first.ep[edge] for edge in second.ep),
+        tuple((first.eo[edge] + flip) % 2 for edge, flip in zip(second.ep, second.eo))
+    )
+
+
+def inverse(cubie: CubieCube) -> CubieCube:
+    """
+    :param cubie: cubie cube
+    :return: the cubie cube which undoes it
+    """
+    cp, co, ep, eo = [0] * 8, [0] * 8, [0] * 12, [0] * 12
+    for position, corner in enumerate(cubie.cp):
+        cp[corner] = position
+        co[corner] = -cubie.co[position] % 3
+    for position, edge in enumerate(cubie.ep):
+        ep[edge] = position
+        eo[edge] = cubie.eo[position]
+    return CubieCube(tuple(cp), tuple(co), tuple(ep), tuple(eo))
+
+
+_SOLVED_CODES = [index // 9 for index in range(54)]
+
+# cubie cube of every move in POSSIBLE_MOVES, derived from the sticker permutations
+MOVE_CUBIES = {move: from_face_codes([_SOLVED_CODES[index] for index in MOVE_PERMUTATIONS[move]])
+               for move in POSSIBLE_MOVES}
@@ -0,0 +1,350 @@
+"""
+Rubik's Cube Solver
+Copyright (C) 2021  Felix Drees
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+How to contact me by electronic and/or paper mail:
+  https://github.com/felix-drees
+"""
+
+"""
+COMPACT STATE ENCODING:
+
+A 3x3x3 cube is one integer made of four coordinates of its cubie cube (see cubie):
+
+code = ((corner permutation * 3^7 + twist) * 12! + edge permutation) * 2^11 + flip
+
+The permutations are ranked lexicographically, twist and flip are the orientations of the first 7 corners / 11 edges
+(the last one follows from the others). Every code is below 2^67, as bytes it is a 9 byte big endian key, so sorting
+the keys sorts the codes. Equal cubes have equal codes, no matter if they use colours or letters.
+
+EXAMPLE OF USE:
+
+seen = set()
+for scramble in scrambles:
+    seen.add(create_scrambled_cube(scramble).key())
+
+BatchCube(...).keys()  # the same keys for many cubes at once, as (N, 9) uint8 array
+"""
+
+from Cube import COLOR_BOARD, LETTER_BOARD
+from cubie import CubieCube, CORNER_FACELETS, EDGE_FACELETS, from_state
+from math import factorial
+from operator import itemgetter
+import numpy as np
+
+
+N_TWIST = 3 ** 7
+N_FLIP = 2 ** 11
+N_CORNER_PERMUTATIONS = factorial(8)
+N_EDGE_PERMUTATIONS = factorial(12)
+
+KEY_BYTES = 9
+
+
+def twist_of(co: tuple) -> int:
+    twist = 0
+    for orientation in co[:7]:
+        twist = 3 * twist + orientation
+    return twist
+
+
+def flip_of(eo: tuple) -> int:
+    flip = 0
+    for orientation in eo[:11]:
+        flip = 2 * flip + orientation
+    return flip
+
+
+def permutation_rank(permutation) -> int:
+    """
+    lexicographic rank of a permutation of 0 .. n-1 (Lehmer code)
+    """
+    rank, used = 0, 0
+    for index, value in enumerate(permutation):
+        # the smaller values which are not used yet come later
+        rank = rank * (len(permutation) - index) + value - (used & ((1 << value) - 1)).bit_count()
+        used |= 1 << value
+    return rank
+
+
+def permutation_unrank(rank: int, size: int) -> tuple:
+    """
+    :param rank: lexicographic rank, see permutation_rank
+    :param size: length of the permutation
+    :return: the permutation of 0 .. size-1 with this rank
+    """
+    digits = []
+    for base in range(1, size + 1):
+        rank, digit = divmod(rank, base)
+        digits.append(digit)
+    remaining = list(range(size))
+    return tuple(remaining.pop(digit) for digit in reversed(digits))
+
+
+def permutation_ranks(permutations_array: np.ndarray) -> np.ndarray:
+    """
+    lexicographic ranks of many permutations at once
+    :param permutations_array: (N, n) array, every row is a permutation of 0 .. n-1
+    :return: (N,) array of ranks
+    """
+    rows, n = permutations_array.shape
+    ranks = np.zeros(rows, dtype=np.int64)
+    for index in range(n):
+        smaller = (permutations_array[:, index + 1:] < permutations_array[:, index:index + 1]).sum(axis=1)
+        ranks = ranks * (n - index) + smaller
+    return ranks
+
+
+def encode(cubie: CubieCube) -> int:
+    """
+    :param cubie: cubie cube
+    :return: its code
+    """
+    corners = permutation_rank(cubie.cp) * N_TWIST + twist_of(cubie.co)
+    edges = permutation_rank(cubie.ep) * N_FLIP + flip_of(cubie.eo)
+    return corners * (N_EDGE_PERMUTATIONS * N_FLIP) + edges
+
+
+def decode(code: int) -> CubieCube:
+    """
+    :param code: code of a cubie cube, see encode
+    :return: the cubie cube
+    """
+    if not 0 <= code < N_CORNER_PERMUTATIONS * N_TWIST * N_EDGE_PERMUTATIONS * N_FLIP:
+        raise ValueError(f'Code out of range: {code}.')
+    code, flip = divmod(code, N_FLIP)
+    code, edges = divmod(code, N_EDGE_PERMUTATIONS)
+    corners, twist = divmod(code, N_TWIST)
+    co, eo = [], []
+    for _ in range(7):
+        twist, orientation = divmod(twist, 3)
+        co.insert(0, orientation)
+    for _ in range(11):
+        flip, orientation = divmod(flip, 2)
+        eo.insert(0, orientation)
+    return CubieCube(permutation_unrank(corners, 8), tuple(co + [-sum(co) % 3]),
+                     permutation_unrank(edges, 12), tuple(eo + [sum(eo) % 2]))
+
+
+def to_key(code: int) -> bytes:
+    return code.to_bytes(KEY_BYTES, 'big')
+
+
+def from_key(key: bytes) -> int:
+    if len(key) != KEY_BYTES: raise ValueError(f'A key has {KEY_BYTES} bytes.')
+    return int.from_bytes(key, 'big')
+
+
+"""
+STICKERS:
+
+The stickers of a piece in the standard colour (or letter) scheme identify the piece and its orientation directly,
+so a state is encoded without building the cubie cube first. Cubes with moved centers (e.g. after wide moves) take the
+slower way through cubie.from_state.
+"""
+
+
+def _piece_lookup(facelets_of_pieces: list) -> dict:
+    """
+    :return: stickers of a piece in any position -> (piece, orientation), for colours and letters
+    """
+    lookup = {}
+    for board in (COLOR_BOARD, LETTER_BOARD):
+        solved = [sticker for side in board for row in side for sticker in row]
+        for piece, facelets in enumerate(facelets_of_pieces):
+            stickers = [solved[index] for index in facelets]
+            for orientation in range(len(facelets)):
+                # orientation o: the reference sticker of the piece lies o stickers further (see cubie.to_face_codes)
+                lookup[tuple(stickers[(offset - orientation) % len(facelets)] for offset in range(len(facelets)))] \
+                    = piece, orientation
+    return lookup
+
+
+_CORNER_LOOKUP = _piece_lookup(CORNER_FACELETS)
+_EDGE_LOOKUP = _piece_lookup(EDGE_FACELETS)
+_CORNER_GATHERS = [itemgetter(*facelets) for facelets in CORNER_FACELETS]
+_EDGE_GATHERS = [itemgetter(*facelets) for facelets in EDGE_FACELETS]
+_CENTERS = itemgetter(4, 13, 22, 31, 40, 49)
+_STANDARD_CENTERS = {_CENTERS([sticker for side in board for row in side for sticker in row])
+                     for board in (COLOR_BOARD, LETTER_BOARD)}
+
+
+def encode_state(state: tuple) -> int:
+    """
+    :param state: flat state of a 3x3x3 CubeObj (colours or letters)
+    :return: code of the cube
+    """
+    try:
+        if _CENTERS(state) not in _STANDARD_CENTERS:
+            raise KeyError
+        cp, co = zip(*[_CORNER_LOOKUP[gather(state)] for gather in _CORNER_GATHERS])
+        ep, eo = zip(*[_EDGE_LOOKUP[gather(state)] for gather in _EDGE_GATHERS])
+    except KeyError:
+        return encode(from_state(state))  # moved centers, raises ValueError for impossible stickers
+    return encode(CubieCube(cp, co, ep, eo))
+
+
+def to_permutation(cubie: CubieCube) -> tuple:
+    """
+    :param cubie: cubie cube
+    :return: sticker permutation which turns the solved state into the cube, new_state[i] = solved[permutation[i]]
+    """
+    permutation = list(range(54))
+    for position, facelets in enumerate(CORNER_FACELETS):
+        source, twist = CORNER_FACELETS[cubie.cp[position]], cubie.co[position]
+        for offset, index in enumerate(facelets):
+            permutation[index] = source[(offset - twist) % 3]
+    for position, facelets in enumerate(EDGE_FACELETS):
+        source, flip = EDGE_FACELETS[cubie.ep[position]], cubie.eo[position]
+        for offset, index in enumerate(facelets):
+            permutation[index] = source[(offset + flip) % 2]
+    return tuple(permutation)
+
+
+"""
+BATCH:
+"""
+
+
+def _piece_table(lookup: dict, stickers: int, codes: dict) -> np.ndarray:
+    """
+    :return: table[side codes of a piece as number in base 6] -> 3 * piece + orientation, -1 for impossible pieces
+    """
+    table = np.full(6 ** stickers, -1, dtype=np.int16)
+    for piece_stickers, (piece, orientation) in lookup.items():
+        if all(sticker in codes for sticker in piece_stickers):
+            index = 0
+            for sticker in piece_stickers:
+                index = 6 * index + codes[sticker]
+            table[index] = 3 * piece + orientation
+    return table
+
+
+_CODE_OF_COLOUR = {side[1][1]: code for code, side in enumerate(COLOR_BOARD)}
+_CORNER_TABLE = _piece_table(_CORNER_LOOKUP, 3, _CODE_OF_COLOUR)
+_EDGE_TABLE = _piece_table(_EDGE_LOOKUP, 2, _CODE_OF_COLOUR)
+
+
+def pieces_of_codes(codes: np.ndarray) -> tuple:
+    """
+    identify the pieces of many cubes at once
+    :param codes: (N, 54) array of side indices 0 .. 5, e.g. BatchCube.states
+    :return: (N, 8) and (N, 12) int16 arrays, 3 * piece + orientation at every position, -1 for impossible pieces
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    return (_CORNER_TABLE[(codes[:, CORNER_FACELETS] * np.array([36, 6, 1])).sum(axis=2)],
+            _EDGE_TABLE[(codes[:, EDGE_FACELETS] * np.array([6, 1])).sum(axis=2)])
+
+
+def encode_codes(codes: np.ndarray) -> np.ndarray:
+    """
+    encode many cubes at once
+    :param codes: (N, 54) array of side indices, e.g. BatchCube.states
+    :return: (N, 9) uint8 array, row i is the key of cube i (see to_key)
+    """
+    corners, edges = pieces_of_codes(codes)
+    if (corners < 0).any() or (edges < 0).any():
+        raise ValueError('Impossible corner or edge in the states.')
+
+    cp, co = np.divmod(corners.astype(np.int64), 3)
+    ep, eo = np.divmod(edges.astype(np.int64), 3)
+    return encode_cubies(cp, co, ep, eo)
+
+
+def encode_cubies(cp: np.ndarray, co: np.ndarray, ep: np.ndarray, eo: np.ndarray) -> np.ndarray:
+    """
+    encode many cubie cubes at once
+    :param cp: (N, 8) corner permutations, co: (N, 8) corner orientations
+    :param ep: (N, 12) edge permutations, eo: (N, 12) edge orientations
+    :return: (N, 9) uint8 array, row i is the key of cubie cube i (see to_key)
+    """
+    cp, co, ep, eo = (np.asarray(array, dtype=np.int64) for array in (cp, co, ep, eo))
+    return encode_coordinates(permutation_ranks(cp), co[:, :7] @ (3 ** np.arange(6, -1, -1)),
+                              permutation_ranks(ep), eo[:, :11] @ (2 ** np.arange(10, -1, -1)))
+
+
+def encode_coordinates(corners: np.ndarray, twist: np.ndarray, edges: np.ndarray, flip: np.ndarray) -> np.ndarray:
+    """
+    encode many cubes given by their coordinates (ranks of the permutations, twist and flip, see encode)
+    :return: (N, 9) uint8 array, row i is the key of cube i (see to_key)
+    """
+    high = np.asarray(corners, dtype=np.int64) * N_TWIST + twist
+    low = np.asarray(edges, dtype=np.int64) * N_FLIP + flip
+
+    # code = high * 12! * 2^11 + low does not fit 64 bits, multiply in two 32 bit halves
+    multiplier = N_EDGE_PERMUTATIONS * N_FLIP
+    lower = high * (multiplier & 0xFFFFFFFF) + low
+    upper = high * (multiplier >> 32) + (lower >> 32)
+    keys = np.empty((len(high), KEY_BYTES), dtype=np.uint8)
+    keys[:, :5] = upper.astype('>u8').view(np.uint8).reshape(-1, 8)[:, 3:]
+    keys[:, 5:] = (lower & 0xFFFFFFFF).astype('>u4').view(np.uint8).reshape(-1, 4)
+    return keys
+
+
+def permutation_unranks(ranks: np.ndarray, size: int) -> np.ndarray:
+    """
+    many permutations of their lexicographic ranks at once, the inverse of permutation_ranks
+    :param ranks: (N,) array of ranks
+    :param size: length of the permutations
+    :return: (N, size) int8 array
+    """
+    ranks = np.asarray(ranks, dtype=np.int64)
+    available = np.ones((len(ranks), size), dtype=bool)
+    permutations_array = np.empty((len(ranks), size), dtype=np.int8)
+    for index in range(size):
+        digits, ranks = np.divmod(ranks, factorial(size - 1 - index))
+        # the value is the (digit + 1)-th of the values which are not used yet
+        value = (np.cumsum(available, axis=1) == (digits + 1)[:, np.newaxis]).argmax(axis=1)
+        permutations_array[:, index] = value
+        available[np.arange(len(ranks)), value] = False
+    return permutations_array
+
+
+def decode_keys(keys: np.ndarray) -> tuple:
+    """
+    decode many keys at once, the inverse of encode_cubies
+    :param keys: (N, 9) uint8 array, see to_key
+    :return: cp, co (N, 8) and ep, eo (N, 12) int8 arrays
+    """
+    keys = np.asarray(keys, dtype=np.uint8).reshape(-1, KEY_BYTES)
+    upper, lower = np.zeros(len(keys), dtype=np.int64), np.zeros(len(keys), dtype=np.int64)
+    for column in range(KEY_BYTES):
+        if column < 5:
+            upper = upper << 8 | keys[:, column]
+        else:
+            lower = lower << 8 | keys[:, column]
+
+    # code = upper * 2^32 + lower does not fit 64 bits: estimate high = code // multiplier with floats (off by at most
+    # one), the remainder is exact in two 32 bit halves and corrects the estimate
+    multiplier = N_EDGE_PERMUTATIONS * N_FLIP
+    high = np.floor((upper * 2.0 ** 32 + lower) / multiplier).astype(np.int64)
+    low = ((upper - high * (multiplier >> 32)) << 32) + lower - high * (multiplier & 0xFFFFFFFF)
+    for _ in range(2):
+        high, low = np.where(low < 0, high - 1, high), np.where(low < 0, low + multiplier, low)
+        high, low = np.where(low >= multiplier, high + 1, high), np.where(low >= multiplier, low - multiplier, low)
+    if ((high < 0) | (high >= N_CORNER_PERMUTATIONS * N_TWIST)).any(): raise ValueError('Key out of range.')
+
+    corners, twist = np.divmod(high, N_TWIST)
+    edges, flip = np.divmod(low, N_FLIP)
+    co = np.empty((len(keys), 8), dtype=np.int8)
+    eo = np.empty((len(keys), 12), dtype=np.int8)
+    for index in range(6, -1, -1):
+        twist, co[:, index] = np.divmod(twist, 3)
+    for index in range(10, -1, -1):
+        flip, eo[:, index] = np.divmod(flip, 2)
+    co[:, 7] = -co[:, :7].sum(axis=1, dtype=np.int64) % 3
+    eo[:, 11] = eo[:, :11].sum(axis=1, dtype=np.int64) % 2
+    return permutation_unranks(corners, 8), co, permutation_unranks(edges, 12), eo
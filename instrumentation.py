@@ -0,0 +1,216 @@
+"""
+Rubik's Cube Solver
+Copyright (C) 2021  Felix Drees
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+How to contact me by electronic and/or paper mail:
+  https://github.com/felix-drees
+"""
+
+"""
+EXAMPLE OF USE:
+
+aggregate = AggregateCollector()
+with collecting(aggregate):
+    for scramble in scrambles:
+        solve_old_pochmann(create_scrambled_cube(scramble))
+
+print(aggregate.summary())
+
+Without a collector (the default) the solvers only check one global per solve, so the instrumentation costs nothing.
+"""
+
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from threading import Lock, local
+from time import perf_counter
+import json
+
+
+class SolveRecord:
+    """
+    measurements of a single solve: time and number of moves per phase, applied permutations and rescans
+    """
+
+    def __init__(self, solver: str) -> None:
+        self.solver = solver
+        self.phases = {}
+        self.permutations_applied = 0
+        self.center_rescans = 0
+        self.corner_rescans = 0
+        self._start = self._phase_start = perf_counter()
+        self.total_time = 0.0
+
+    def end_phase(self, name: str, moves: int) -> None:
+        """
+        finish a phase of the solve, the next phase starts now
+        :param name: e.g. 'edges', 'parity', 'corners'
+        :param moves: number of moves applied in the phase
+        """
+        now = perf_counter()
+        self.phases[name] = {'time': now - self._phase_start, 'moves': moves}
+        self._phase_start = now
+
+    def as_dict(self) -> dict:
+        return {
+            'solver': self.solver,
+            'total_time': self.total_time,
+            'phases': self.phases,
+            'permutations_applied': self.permutations_applied,
+            'center_rescans': self.center_rescans,
+            'corner_rescans': self.corner_rescans
+        }
+
+
+class Collector(ABC):
+    """
+    receives the record of every solve, subclass it and implement collect
+    """
+
+    @abstractmethod
+    def collect(self, record: dict) -> None:
+        """
+        :param record: SolveRecord.as_dict of a finished solve
+        """
+
+
+class CallbackCollector(Collector):
+    def __init__(self, callback) -> None:
+        self._callback = callback
+
+    def collect(self, record: dict) -> None:
+        self._callback(record)
+
+
+class JsonLinesCollector(Collector):
+    """
+    writes every record as one line of JSON to a file object
+    """
+
+    def __init__(self, file) -> None:
+        self._file = file
+        self._lock = Lock()
+
+    def collect(self, record: dict) -> None:
+        line = json.dumps(record) + '\n'
+        with self._lock:
+            self._file.write(line)
+
+
+class AggregateCollector(Collector):
+    """
+    sums up the records in memory
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.solves = 0
+        self.totals = {'total_time': 0.0, 'permutations_applied': 0, 'center_rescans': 0, 'corner_rescans': 0}
+        self.phases = {}
+
+    def collect(self, record: dict) -> None:
+        with self._lock:
+            self.solves += 1
+            for key in self.totals:
+                self.totals[key] += record[key]
+            for name, phase in record['phases'].items():
+                total = self.phases.setdefault(name, {'time': 0.0, 'moves': 0, 'count': 0})
+                total['time'] += phase['time']
+                total['moves'] += phase['moves']
+                total['count'] += 1
+
+    def summary(self) -> dict:
+        """
+        :return: totals and the means per solve
+        """
+        with self._lock:
+            solves = self.solves or 1
+            return {
+                'solves': self.solves,
+                'totals': dict(self.totals),
+                'means': {key: value / solves for key, value in self.totals.items()},
+                'phases': {name: dict(phase, mean_time=phase['time'] / solves, mean_moves=phase['moves'] / solves)
+                           for name, phase in self.phases.items()}
+            }
+
+
+_collector = None
+enabled = False  # cheap check for the hot paths, True while a collector is set
+_current = local()  # record of the solve which runs in this thread, read by the cube to count its calls
+_current.record = None
+
+
+def set_collector(collector: Collector = None) -> None:
+    """
+    enable the instrumentation with the given collector, None disables it
+    """
+    global _collector, enabled
+    _collector = collector
+    enabled = collector is not None
+
+
+def get_collector() -> Collector:
+    return _collector
+
+
+@contextmanager
+def collecting(collector: Collector):
+    """
+    enable the instrumentation inside of a with block
+    """
+    previous = _collector
+    set_collector(collector)
+    try:
+        yield collector
+    finally:
+        set_collector(previous)
+
+
+def begin_solve(solver: str) -> SolveRecord:
+    """
+    :param solver: name of the solver
+    :return: a new record, None if the instrumentation is disabled
+    """
+    if _collector is None:
+        return None
+    record = SolveRecord(solver)
+    _current.record = record
+    return record
+
+
+def end_solve(record: SolveRecord) -> None:
+    """
+    send a finished record to the collector
+    """
+    record.total_time = perf_counter() - record._start
+    _current.record = None
+    if _collector is not None:
+        _collector.collect(record.as_dict())
+
+
+def leave_solve(record: SolveRecord) -> None:
+    """
+    forget the record of the solve which runs in this thread, the solvers call it in a finally block, so the calls
+    after a failed solve (its record is not collected) are not counted into it
+    """
+    if record is not None and current_record() is record:
+        _current.record = None
+
+
+def current_record() -> SolveRecord:
+    """
+    :return: the record of the solve which runs in this thread, None if there is none
+    """
+    return getattr(_current, 'record', None)
@@ -0,0 +1,352 @@
+"""
+Rubik's Cube Solver
+Copyright (C) 2021  Felix Drees
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+How to contact me by electronic and/or paper mail:
+  https://github.com/felix-drees
+"""
+
+"""
+https://kociemba.org/cube.htm
+
+Two-phase algorithm:
+
+Phase 1 brings the cube into the subgroup G1 = <U, D, R2, L2, F2, B2>, i.e. all corners and edges are oriented and the
+four edges of the UD-slice (FR, FL, BL, BR) are in the slice. Phase 2 solves the cube with the moves of G1 only.
+Both phases are an IDA* search on coordinates (numbers which describe a part of the cube), moved by move tables and
+bounded by pruning tables (minimal number of moves to solve a pair of coordinates).
+
+The tables are built once (a few seconds) and saved in CACHE_DIRECTORY, later processes only load them.
+
+EXAMPLE OF USE:
+
+my_cube = create_scrambled_cube("R U R' U' F2 D L2 B'")
+print(solve_kociemba(my_cube))  # e.g. ['B', 'L2', 'D’', 'F2', 'U', 'R', 'U’', 'R’']
+"""
+
+from Cube import CubeObj as Cube, POSSIBLE_MOVES, MOVE_PERMUTATIONS, AXIS_OF_FACE
+from cubie import CubieCube, MOVE_CUBIES, from_state, multiply
+from encoding import twist_of, flip_of, permutation_rank, permutation_ranks
+from table_cache import CACHE_DIRECTORY
+from validation import validate_state
+from itertools import permutations
+from math import comb
+from time import perf_counter
+import hashlib
+import numpy as np
+import os
+
+
+N_TWIST = 3 ** 7  # orientation of the corners
+N_FLIP = 2 ** 11  # orientation of the edges
+N_SLICE = comb(12, 4)  # positions of the four UD-slice edges
+N_CORNERS = 8 * 7 * 6 * 5 * 4 * 3 * 2  # permutation of the corners
+N_UD_EDGES = N_CORNERS  # permutation of the eight U/D edges (phase 2)
+N_SLICE_SORTED = 4 * 3 * 2  # permutation of the four UD-slice edges (phase 2)
+
+N_MOVES = len(POSSIBLE_MOVES)
+PHASE2_MOVES = [POSSIBLE_MOVES.index(move) for move in ['U', 'U2', 'U’', 'D', 'D2', 'D’', 'R2', 'L2', 'F2', 'B2']]
+
+FACE_OF_MOVE_INDEX = [POSSIBLE_MOVES.index(move[0]) for move in POSSIBLE_MOVES]
+AXIS_OF_MOVE_INDEX = [AXIS_OF_FACE[move[0]] for move in POSSIBLE_MOVES]
+
+# every cube is brought into G1 with at most 12 moves and solved in G1 with at most 18 moves
+MAX_PHASE1_DEPTH = 12
+MAX_PHASE2_DEPTH = 18
+
+TABLES_VERSION = 1
+
+
+"""
+COORDINATES (twist, flip and the ranks of permutations are shared with encoding):
+"""
+
+
+def slice_of(ep: tuple) -> int:
+    """
+    rank of the positions of the UD-slice edges (combinatorial number system), 494 if they are in the slice
+    """
+    positions = [position for position, edge in enumerate(ep) if edge >= 8]
+    return sum(comb(position, k + 1) for k, position in enumerate(positions))
+
+
+"""
+TABLES:
+"""
+
+
+def _twist_move_table() -> np.ndarray:
+    orientations = np.array(list(np.ndindex(*(3,) * 7)), dtype=np.int64)  # row t is the twist t
+    co = np.column_stack([orientations, -orientations.sum(axis=1) % 3])
+    table = np.empty((N_TWIST, N_MOVES), dtype=np.int16)
+    for index, move in enumerate(POSSIBLE_MOVES):
+        cubie = MOVE_CUBIES[move]
+        moved = (co[:, cubie.cp] + np.array(cubie.co)) % 3
+        table[:, index] = moved[:, :7] @ (3 ** np.arange(6, -1, -1))
+    return table
+
+
+def _flip_move_table() -> np.ndarray:
+    orientations = np.array(list(np.ndindex(*(2,) * 11)), dtype=np.int64)
+    eo = np.column_stack([orientations, orientations.sum(axis=1) % 2])
+    table = np.empty((N_FLIP, N_MOVES), dtype=np.int16)
+    for index, move in enumerate(POSSIBLE_MOVES):
+        cubie = MOVE_CUBIES[move]
+        moved = (eo[:, cubie.ep] + np.array(cubie.eo)) % 2
+        table[:, index] = moved[:, :11] @ (2 ** np.arange(10, -1, -1))
+    return table
+
+
+def _slice_move_table() -> np.ndarray:
+    table = np.empty((N_SLICE, N_MOVES), dtype=np.int16)
+    for rank in range(N_SLICE):
+        # decode the combinatorial number greedily, largest position first
+        positions, rest = [], rank
+        for k in range(4, 0, -1):
+            position = k - 1
+            while comb(position + 1, k) <= rest:
+                position += 1
+            positions.append(position)
+            rest -= comb(position, k)
+        ep = [8 if position in positions else 0 for position in range(12)]
+        for index, move in enumerate(POSSIBLE_MOVES):
+            table[rank, index] = slice_of([ep[edge] for edge in MOVE_CUBIES[move].ep])
+    return table
+
+
+def _permutation_move_table(size: int, offset: int, moves: list, corners: bool) -> np.ndarray:
+    """
+    move table of a permutation coordinate
+    :param size: number of pieces of the coordinate
+    :param offset: position of the first piece (8 for the UD-slice edges)
+    :param moves: indices of the moves which keep the pieces in their positions, -1 for all others
+    :param corners: True for corners, False for edges
+    """
+    states = np.array(list(permutations(range(size))), dtype=np.int64)  # row r has the rank r
+    table = np.full((len(states), N_MOVES), -1, dtype=np.int32)
+    for index in moves:
+        cubie = MOVE_CUBIES[POSSIBLE_MOVES[index]]
+        move_permutation = np.array((cubie.cp if corners else cubie.ep)[offset:offset + size]) - offset
+        table[:, index] = permutation_ranks(states[:, move_permutation])
+    return table
+
+
+def _pruning_table(first_move: np.ndarray, second_move: np.ndarray, moves: list, goal: int) -> np.ndarray:
+    """
+    breadth first search over the pair of two coordinates
+    :param first_move: move table of the first coordinate
+    :param second_move: move table of the second coordinate
+    :param moves: indices of the moves of the phase
+    :param goal: index first * len(second_move) + second of the solved state
+    :return: minimal number of moves for every index of the pair
+    """
+    n_second = len(second_move)
+    distance = np.full(len(first_move) * n_second, -1, dtype=np.int8)
+    distance[goal] = 0
+    frontier = np.array([goal], dtype=np.int64)
+    for depth in range(1, 128):
+        first, second = np.divmod(frontier, n_second)
+        reached = np.unique(np.concatenate([first_move[first, move].astype(np.int64) * n_second
+                                            + second_move[second, move] for move in moves]))
+        frontier = reached[distance[reached] == -1]
+        if not len(frontier):
+            return distance
+        distance[frontier] = depth
+    return distance
+
+
+def move_fingerprint() -> str:
+    """
+    hash of the move definitions, tables of other move definitions are never loaded
+    """
+    return hashlib.sha1(repr([MOVE_PERMUTATIONS[move] for move in POSSIBLE_MOVES]).encode()).hexdigest()[:12]
+
+
+def build_tables() -> dict:
+    """
+    create all move and pruning tables of the two-phase algorithm
+    :return: name -> numpy array
+    """
+    tables = {
+        'twist_move': _twist_move_table(),
+        'flip_move': _flip_move_table(),
+        'slice_move': _slice_move_table(),
+        'corner_move': _permutation_move_table(8, 0, list(range(N_MOVES)), True),
+        'ud_edge_move': _permutation_move_table(8, 0, PHASE2_MOVES, False),
+        'slice_sorted_move': _permutation_move_table(4, 8, PHASE2_MOVES, False)
+    }
+    solved_slice = slice_of(tuple(range(12)))
+    all_moves = list(range(N_MOVES))
+    tables['twist_slice_prune'] = _pruning_table(tables['slice_move'], tables['twist_move'], all_moves,
+                                                 solved_slice * N_TWIST)
+    tables['flip_slice_prune'] = _pruning_table(tables['slice_move'], tables['flip_move'], all_moves,
+                                                solved_slice * N_FLIP)
+    tables['corner_slice_prune'] = _pruning_table(tables['corner_move'], tables['slice_sorted_move'],
+                                                  PHASE2_MOVES, 0)
+    tables['edge_slice_prune'] = _pruning_table(tables['ud_edge_move'], tables['slice_sorted_move'],
+                                                PHASE2_MOVES, 0)
+    return tables
+
+
+def load_tables(cache_directory: str = None) -> dict:
+    """
+    load the tables from the disk cache, build and save them if they are missing
+    :param cache_directory: default CACHE_DIRECTORY
+    :return: name -> numpy array
+    """
+    cache_directory = cache_directory or CACHE_DIRECTORY
+    path = os.path.join(cache_directory, f'kociemba_v{TABLES_VERSION}_{move_fingerprint()}.npz')
+    if os.path.exists(path):
+        with np.load(path) as archive:
+            return {name: archive[name] for name in archive.files}
+
+    tables = build_tables()
+    os.makedirs(cache_directory, exist_ok=True)
+    temporary = f'{path}.{os.getpid()}.tmp.npz'
+    np.savez(temporary, **tables)
+    os.replace(temporary, path)  # atomic, concurrent processes never see half written tables
+    return tables
+
+
+"""
+SEARCH:
+"""
+
+
+class TwoPhaseSolver:
+    """
+    holds the tables as Python lists / bytes, which are faster to index one by one than numpy arrays
+    """
+
+    def __init__(self, tables: dict = None) -> None:
+        tables = tables if tables is not None else load_tables()
+        self._twist_move = tables['twist_move'].tolist()
+        self._flip_move = tables['flip_move'].tolist()
+        self._slice_move = tables['slice_move'].tolist()
+        self._corner_move = tables['corner_move'].tolist()
+        self._ud_edge_move = tables['ud_edge_move'].tolist()
+        self._slice_sorted_move = tables['slice_sorted_move'].tolist()
+        self._twist_slice_prune = tables['twist_slice_prune'].tobytes()
+        self._flip_slice_prune = tables['flip_slice_prune'].tobytes()
+        self._corner_slice_prune = tables['corner_slice_prune'].tobytes()
+        self._edge_slice_prune = tables['edge_slice_prune'].tobytes()
+
+    def solve(self, cubie: CubieCube, max_length: int = 24, timeout: float = 10.0) -> list:
+        """
+        search a solution
+        :param cubie: cubie cube of the scrambled cube
+        :param max_length: return the first solution with at most this many moves
+        :param timeout: seconds, afterwards the shortest solution found up to now is returned
+        :return: indices of the moves in POSSIBLE_MOVES
+        """
+        # the first solution is allowed to be long, each further one has to be shorter than the best up to now
+        deadline = perf_counter() + timeout
+        best = None
+        phase1_moves = []
+        twist, flip, slc = twist_of(cubie.co), flip_of(cubie.eo), slice_of(cubie.ep)
+
+        def phase2(corners: int, edges: int, slc_sorted: int, togo: int, last_move: int, moves: list) -> bool:
+            if togo == 0:
+                return corners == 0 and edges == 0 and slc_sorted == 0
+            for move in PHASE2_MOVES:
+                if last_move >= 0 and (FACE_OF_MOVE_INDEX[move] == FACE_OF_MOVE_INDEX[last_move] or (
+                        AXIS_OF_MOVE_INDEX[move] == AXIS_OF_MOVE_INDEX[last_move]
+                        and FACE_OF_MOVE_INDEX[move] < FACE_OF_MOVE_INDEX[last_move])):
+                    continue
+                new_corners = self._corner_move[corners][move]
+                new_edges = self._ud_edge_move[edges][move]
+                new_slice = self._slice_sorted_move[slc_sorted][move]
+                if max(self._corner_slice_prune[new_corners * N_SLICE_SORTED + new_slice],
+                       self._edge_slice_prune[new_edges * N_SLICE_SORTED + new_slice]) >= togo:
+                    continue
+                moves.append(move)
+                if phase2(new_corners, new_edges, new_slice, togo - 1, move, moves):
+                    return True
+                moves.pop()
+            return False
+
+        def start_phase2(limit: int) -> list:
+            state = cubie
+            for move in phase1_moves:
+                state = multiply(state, MOVE_CUBIES[POSSIBLE_MOVES[move]])
+            corners = permutation_rank(state.cp)
+            edges = permutation_rank(state.ep[:8])
+            slc_sorted = permutation_rank([edge - 8 for edge in state.ep[8:]])
+            last = phase1_moves[-1] if phase1_moves else -1
+            bound = max(self._corner_slice_prune[corners * N_SLICE_SORTED + slc_sorted],
+                        self._edge_slice_prune[edges * N_SLICE_SORTED + slc_sorted])
+            for depth in range(bound, limit + 1):
+                moves = []
+                if phase2(corners, edges, slc_sorted, depth, last, moves):
+                    return moves
+            return None
+
+        def phase1(twist: int, flip: int, slc: int, togo: int, last_move: int, total: int) -> bool:
+            nonlocal best
+            if togo == 0:
+                limit = min(MAX_PHASE2_DEPTH, len(best) - 1 - total) if best else MAX_PHASE2_DEPTH
+                moves = start_phase2(limit)
+                if moves is not None:
+                    best = phase1_moves + moves
+                return best is not None and len(best) <= max_length or perf_counter() > deadline
+            for move in range(N_MOVES):
+                if last_move >= 0 and (FACE_OF_MOVE_INDEX[move] == FACE_OF_MOVE_INDEX[last_move] or (
+                        AXIS_OF_MOVE_INDEX[move] == AXIS_OF_MOVE_INDEX[last_move]
+                        and FACE_OF_MOVE_INDEX[move] < FACE_OF_MOVE_INDEX[last_move])):
+                    continue
+                if togo == 1 and move in PHASE2_MOVES:
+                    continue  # the cube was already in G1 one move earlier, that solution was tried before
+                new_twist = self._twist_move[twist][move]
+                new_flip = self._flip_move[flip][move]
+                new_slice = self._slice_move[slc][move]
+                if max(self._twist_slice_prune[new_slice * N_TWIST + new_twist],
+                       self._flip_slice_prune[new_slice * N_FLIP + new_flip]) >= togo:
+                    continue
+                phase1_moves.append(move)
+                done = phase1(new_twist, new_flip, new_slice, togo - 1, move, total + 1)
+                phase1_moves.pop()
+                if done:
+                    return True
+            return False
+
+        start = max(self._twist_slice_prune[slc * N_TWIST + twist], self._flip_slice_prune[slc * N_FLIP + flip])
+        for depth in range(start, MAX_PHASE1_DEPTH + 1):
+            if phase1(twist, flip, slc, depth, -1, 0) or (best is not None and depth >= len(best)):
+                break
+            if perf_counter() > deadline:
+                break
+
+        if best is None:
+            raise TimeoutError(f'No solution found in {timeout} s.')
+        return best
+
+
+_solver = None
+
+
+def solve_kociemba(my_cube: Cube, max_length: int = 24, timeout: float = 10.0) -> list:
+    """
+    solve the cube with the two-phase algorithm, the cube itself is not changed
+    :param my_cube: scrambled 3x3x3 cube e.g. from create_scrambled_cube
+    :param max_length: return the first solution with at most this many moves
+    :param timeout: seconds, afterwards the shortest solution found up to now is returned
+    :return: moves of POSSIBLE_MOVES which solve the cube
+    """
+    global _solver
+    if _solver is None:
+        _solver = TwoPhaseSolver()
+    validate_state(my_cube.state)  # phase 2 never reaches the solved cube from an unsolvable one
+    return [POSSIBLE_MOVES[move] for move in _solver.solve(from_state(my_cube.state), max_length, timeout)]
@@ -0,0 +1,205 @@
+"""
+Rubik's Cube Solver
+Copyright (C) 2021  Felix Drees
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+How to contact me by electronic and/or paper mail:
+  https://github.com/felix-drees
+"""
+
+"""
+MOVE SEQUENCES:
+
+A move sequence is one permutation of the stickers (see compile_moves). Its powers are computed by squaring the
+permutation (a power k needs about 2 log2(k) compositions), its order is the least common multiple of the lengths of
+its cycles: after that many repetitions every sticker is back at its place.
+
+EXAMPLE OF USE:
+
+y_perm = MoveSequence(Y_PERM)
+print(y_perm.order())  # 2
+print(MoveSequence("R U").order())  # 105
+print(MoveSequence("R U").power(10 ** 18).moves)  # the same effect as R U repeated 10^18 times
+print(y_perm.inverse(), y_perm.cycle_structure())
+
+my_cube = CubeObj(3)
+(MoveSequence("R U") ** 52).apply(my_cube)
+"""
+
+from Cube import CubeObj as Cube, compile_moves, compose, inverse_permutation, invert_moves, \
+    normalize_moves
+from collections import Counter
+from math import lcm
+from typing import Union
+
+
+class MoveSequence:
+    """
+    moves in cube notation together with their sticker permutation
+    """
+
+    def __init__(self, moves: Union[str, list] = '', size: int = 3) -> None:
+        """
+        :param moves: moves in cube notation e.g. "R U R' U'", or a list of moves
+        :param size: number of stickers along one edge of the cube
+        """
+        self.size = size
+        self._moves = tuple(normalize_moves(moves if isinstance(moves, str) else ' '.join(moves)).split())
+        self._permutation = compile_moves(' '.join(self._moves), size)  # raises a ValueError for unknown moves
+        self._base, self._exponent = None, 1  # power k of a base sequence, its moves are only written out on demand
+        self._order = None
+
+    @classmethod
+    def _power_of(cls, base: 'MoveSequence', exponent: int, permutation: tuple) -> 'MoveSequence':
+        sequence = cls.__new__(cls)
+        sequence.size, sequence._moves, sequence._permutation = base.size, None, permutation
+        sequence._base, sequence._exponent = base, exponent
+        sequence._order = None
+        return sequence
+
+    @property
+    def moves(self) -> list:
+        """
+        the moves, for a power of a sequence the base repeated (exponent modulo the order of the base) times
+        """
+        if self._moves is None:
+            self._moves = self._base._moves * (self._exponent % self._base.order())
+        return list(self._moves)
+
+    @property
+    def permutation(self) -> tuple:
+        """
+        sticker permutation of the whole sequence, new_state[i] = old_state[permutation[i]]
+        """
+        return self._permutation
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    def __str__(self) -> str:
+        if self._moves is None:
+            return f'({self._base}){self._exponent}'
+        return ' '.join(self._moves)
+
+    def __repr__(self) -> str:
+        return f'MoveSequence({str(self)!r}, size={self.size})'
+
+    def __add__(self, other: 'MoveSequence') -> 'MoveSequence':
+        if not isinstance(other, MoveSequence): return NotImplemented
+        if self.size != other.size: raise ValueError('Both sequences have to be for cubes of the same size.')
+        return MoveSequence(self.moves + other.moves, self.size)
+
+    def __pow__(self, exponent: int) -> 'MoveSequence':
+        return self.power(exponent)
+
+    def apply(self, my_cube: Cube) -> None:
+        """
+        apply the whole sequence to a cube with one gather
+        """
+        my_cube.apply_permutation(self._permutation)
+
+    def inverse(self) -> 'MoveSequence':
+        """
+        :return: the sequence which undoes this one, the moves reversed and each of them inverted
+        """
+        if self._moves is None:
+            return self._base.inverse().power(self._exponent)
+        sequence = MoveSequence.__new__(MoveSequence)
+        sequence.size, sequence._moves = self.size, tuple(invert_moves(list(self._moves)))
+        sequence._permutation = inverse_permutation(self._permutation)
+        sequence._base, sequence._exponent, sequence._order = None, 1, self._order
+        return sequence
+
+    def power(self, exponent: int) -> 'MoveSequence':
+        """
+        :param exponent: number of repetitions, negative for repetitions of the inverse
+        :return: the sequence repeated exponent times, computed with O(log exponent) compositions
+        """
+        if exponent < 0:
+            return self.inverse().power(-exponent)
+
+        # square and multiply, powers of one permutation commute so the order of the compositions does not matter
+        result, square, remaining = tuple(range(len(self._permutation))), self._permutation, exponent
+        while remaining:
+            if remaining & 1:
+                result = compose(result, square)
+            remaining >>= 1
+            if remaining:
+                square = compose(square, square)
+
+        base = self if self._moves is not None else self._base
+        return MoveSequence._power_of(base, exponent * (1 if base is self else self._exponent), result)
+
+    def cycles(self) -> list:
+        """
+        :return: cycles of the sticker permutation with at least 2 stickers, longest first, every cycle as tuple of
+                 flat indices, a sticker moves to the next index of its cycle
+        """
+        seen = [False] * len(self._permutation)
+        cycles = []
+        for start in range(len(self._permutation)):
+            if seen[start]:
+                continue
+            cycle, index = [], start
+            while not seen[index]:
+                seen[index] = True
+                cycle.append(index)
+                index = self._permutation[index]
+            if len(cycle) > 1:
+                # new[i] = old[permutation[i]]: the sticker at permutation[i] moves to i
+                cycles.append(tuple(reversed(cycle)))
+        return sorted(cycles, key=len, reverse=True)
+
+    def order(self) -> int:
+        """
+        :return: the smallest number of repetitions after which the cube is back in its old state
+        """
+        if self._order is None:
+            self._order = lcm(1, *(len(cycle) for cycle in self.cycles()))
+        return self._order
+
+    def cycle_structure(self) -> dict:
+        """
+        :return: number of sticker cycles of every length, for the 3x3x3 cube (with fixed centers) also the cycles of
+                 the corners and edges as (length, twist / flip of the cycle) with the pieces which only turn in place
+        """
+        lengths = Counter(len(cycle) for cycle in self.cycles())
+        structure = {'order': self.order(), 'stickers': dict(sorted(lengths.items()))}
+        if self.size != 3 or any(self._permutation[center] != center for center in range(4, 54, 9)):
+            return structure
+
+        from cubie import from_face_codes  # only needed here, keeps the import of this module cheap
+        cubie = from_face_codes([source // 9 for source in self._permutation])
+        structure['corners'] = _piece_cycles(cubie.cp, cubie.co, 3)
+        structure['edges'] = _piece_cycles(cubie.ep, cubie.eo, 2)
+        return structure
+
+
+def _piece_cycles(permutation: tuple, orientation: tuple, orientations: int) -> list:
+    """
+    :return: (length, orientation change) of every cycle which moves or turns its pieces, longest first
+    """
+    seen = [False] * len(permutation)
+    cycles = []
+    for start in range(len(permutation)):
+        length, turn, index = 0, 0, start
+        while not seen[index]:
+            seen[index] = True
+            length += 1
+            turn += orientation[index]
+            index = permutation[index]
+        if length > 1 or turn % orientations:
+            cycles.append((length, turn % orientations))
+    return sorted(cycles, reverse=True)
@@ -0,0 +1,239 @@
+"""
+Rubik's Cube Solver
+Copyright (C) 2021  Felix Drees
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+How to contact me by electronic and/or paper mail:
+  https://github.com/felix-drees
+"""
+
+"""
+NOTATION:
+
+WCA notation is parsed into normalized moves (the names of move_permutations in Cube):
+
+R U F L B D             sides, R2 half turns, R’ (or R' / R′) anticlockwise, R2’ = R2, R3 = R’
+Rw r 3Rw 3r             wide moves (that many outer layers, lower case letters are two layers), 3R one inner layer
+x y z                   whole cube rotations (like R, U, F)
+M E S                   middle layers (like L, D, F), only odd cubes have them
+(R U R' U')3            group, repeated 3 times, (R U)’ is the inverse of the group
+[R, U]                  commutator R U R’ U’
+[R: U]                  conjugate R U R’, brackets and groups can be nested
+
+The results are cached by the text (scramble logs repeat the same algorithms). Sequences of the usual moves separated by
+spaces are looked up move by move, everything else (brackets, layer numbers) goes through the recursive parser. A
+NotationError (a ValueError) points at the position of the mistake.
+
+EXAMPLE OF USE:
+
+print(parse_notation("[R: U] (r' U2)2 x"))  # ('R', 'U', 'R’', 'Rw’', 'U2', 'Rw’', 'U2', 'x')
+print(normalize_move("3r2'"))  # 3Rw2
+
+try:
+    parse_notation("R U (R' U'")
+except NotationError as error:
+    print(error.position)  # 4, the open bracket
+"""
+
+from functools import lru_cache
+from table_cache import code_sources
+import re
+
+
+# number of distinct texts whose moves are kept by parse_notation
+PARSE_CACHE_SIZE = 4096
+
+# quarter turns -> suffix of the normalized move
+_SUFFIX = {1: '', 2: '2', 3: '’'}
+_PRIMES = "'’′"
+
+_MOVE = rf"(?:\d*(?:[URFDLB]w?|[urfdlb])|[MESxyz])\d*[{_PRIMES}]?"
+_MOVE_PARTS = re.compile(rf"(\d*)([URFDLBurfdlbMESxyz])(w?)(\d*)([{_PRIMES}]?)")
+_TOKENS = re.compile(_MOVE)
+_SPACE = re.compile(r'\s*')
+_AMOUNT = re.compile(rf"(\d*)([{_PRIMES}]?)")
+
+
+class NotationError(ValueError):
+    """
+    mistake in a move sequence, position is the index of the character in the text
+    """
+
+    def __init__(self, reason: str, text: str, position: int, length: int = 1) -> None:
+        end = min(position + max(length, 1), len(text))
+        super().__init__(f'{reason} at position {position}: {text[:position]}>>{text[position:end]}<<{text[end:]}')
+        self.reason, self.text, self.position = reason, text, position
+
+
+def _turns(amount: str, prime: str) -> int:
+    """
+    :return: quarter turns (0 .. 3) of an amount like "2" and a prime
+    """
+    turns = int(amount) if amount else 1
+    return (-turns if prime else turns) % 4
+
+
+@lru_cache(maxsize=None)
+def _layers_and_turns(token: str) -> tuple:
+    """
+    :param token: one move as written e.g. "r'", "3Rw2", "x"
+    :return: turning layers of the normalized move and quarter turns e.g. ('Rw', 3)
+    """
+    prefix, face, wide, amount, prime = _MOVE_PARTS.fullmatch(token).groups()
+    layers = int(prefix) if prefix else None
+    if layers == 0: raise ValueError(f'Layer 0 does not exist in >>{token}<<')
+
+    if face in 'MESxyz':
+        if layers is not None: raise ValueError(f'Layers can not be given for >>{token}<<')
+        name = face
+    elif face.islower() or wide:
+        face = face.upper()
+        name = face if layers == 1 else f'{face}w' if layers in (None, 2) else f'{layers}{face}w'
+    else:
+        name = face if layers in (None, 1) else f'{layers}{face}'
+    return name, _turns(amount, prime)
+
+
+def normalize_move(token: str) -> str:
+    """
+    :param token: one move as written e.g. "r'", "3Rw2", "R4"
+    :return: the normalized move e.g. "Rw’", "3Rw2", or '' for a move without effect
+    """
+    if not _MOVE_PARTS.fullmatch(token): raise NotationError('Move unknown', token, 0, len(token))
+    try:
+        layers, turns = _layers_and_turns(token)
+    except ValueError as error:
+        raise NotationError(str(error), token, 0, len(token)) from None
+    return layers + _SUFFIX[turns] if turns else ''
+
+
+def _inverse(moves: list) -> list:
+    return [(layers, 4 - turns, position) for layers, turns, position in reversed(moves)]
+
+
+class _Parser:
+    """
+    recursive descent over the text, every move is (turning layers, quarter turns, position in the text)
+    """
+
+    def __init__(self, text: str) -> None:
+        self.text, self.position = text, 0
+
+    def error(self, reason: str, length: int = 1) -> NotationError:
+        return NotationError(reason, self.text, self.position, length)
+
+    def skip_space(self) -> None:
+        self.position = _SPACE.match(self.text, self.position).end()
+
+    def sequence(self, closing: str = '', opening: int = 0) -> list:
+        """
+        :param closing: characters which end the sequence, empty for the whole text
+        :param opening: position of the open bracket, for the error if the sequence is not closed
+        """
+        moves = []
+        while True:
+            self.skip_space()
+            if self.position == len(self.text):
+                if closing: raise NotationError(f'Missing >>{closing[-1]}<< for the bracket', self.text, opening)
+                return moves
+            character = self.text[self.position]
+            if character in closing:
+                return moves
+            if character == '(':
+                moves += self.group()
+            elif character == '[':
+                moves += self.bracket()
+            else:
+                moves += self.move()
+
+    def move(self) -> list:
+        token = _TOKENS.match(self.text, self.position)
+        if token is None:
+            raise self.error(f'Unexpected >>{self.text[self.position]}<<')
+        try:
+            layers, turns = _layers_and_turns(token.group())
+        except ValueError as error:
+            raise self.error(str(error), len(token.group())) from None
+        position, self.position = self.position, token.end()
+        return [(layers, turns, position)] if turns else []
+
+    def repeat(self, moves: list) -> list:
+        """
+        apply the amount after a closing bracket, e.g. (R U)2’
+        """
+        amount, prime = _AMOUNT.match(self.text, self.position).groups()
+        self.position += len(amount) + len(prime)
+        count = int(amount) if amount else 1
+        return (_inverse(moves) if prime else moves) * count
+
+    def group(self) -> list:
+        self.position += 1
+        moves = self.sequence(')', self.position - 1)
+        self.position += 1
+        return self.repeat(moves)
+
+    def bracket(self) -> list:
+        opening = self.position
+        self.position += 1
+        first = self.sequence(',:]', opening)
+        separator = self.text[self.position]
+        if separator == ']': raise self.error('Missing >>,<< (commutator) or >>:<< (conjugate)')
+        self.position += 1
+        second = self.sequence(']', opening)
+        self.position += 1
+        if separator == ',':
+            moves = first + second + _inverse(first) + _inverse(second)
+        else:
+            moves = first + second + _inverse(first)
+        return self.repeat(moves)
+
+
+def parse_notation_positions(txt: str) -> list:
+    """
+    :param txt: moves in WCA notation
+    :return: (normalized move, position of the move in the text) of every move, brackets and groups expanded
+    """
+    parser = _Parser(txt)
+    moves = parser.sequence()
+    return [(layers + _SUFFIX[turns], position) for layers, turns, position in moves]
+
+
+# the moves as they are usually written -> normalized move ('' without effect), the fast path of parse_notation
+_COMMON_MOVES = {token: normalize_move(token)
+                 for face in [*'URFDLBurfdlbMESxyz', *(f'{side}w' for side in 'URFDLB')]
+                 for token in [f'{face}{amount}{prime}' for amount in ('', '2', '3') for prime in ('', *_PRIMES)]}
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_notation(txt: str) -> tuple:
+    """
+    :param txt: moves in WCA notation e.g. "(r' U2)2 [R, U] x"
+    :return: the normalized moves, brackets and groups expanded, moves without effect (R4, (R)0) dropped
+    """
+    try:
+        moves = [_COMMON_MOVES[token] for token in txt.split()]
+    except KeyError:  # brackets, layer numbers, moves without spaces in between, mistakes: the parser
+        return tuple(move for move, _ in parse_notation_positions(txt))
+    return tuple(move for move in moves if move)
+
+
+def notation_sources() -> tuple:
+    """
+    :return: the patterns and the code of the parser, a source of the tables which are built from parsed moves (see
+             table_cache)
+    """
+    return (_MOVE, _MOVE_PARTS.pattern, _AMOUNT.pattern, _SUFFIX,
+            code_sources(_turns, _layers_and_turns.__wrapped__, normalize_move, _inverse, parse_notation_positions,
+                         parse_notation.__wrapped__, *(method for method in vars(_Parser).values() if callable(method))))
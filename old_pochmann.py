@@ -26,10 +26,21 @@ How to contact me by electronic and/or paper mail:
 """
 
 
-from Cube import CubeObj as Cube, POSSIBLE_MOVES
-from typing import Union
+from Cube import CubeObj as Cube, POSSIBLE_MOVES, LETTER_BOARD, MOVE_PERMUTATIONS, compile_moves, cancel_moves, \
+    compile_sources, normalize_moves
+from notation import parse_notation
+from table_cache import cached_table
+import instrumentation
+from validation import validate_colour_board, validate_state
+from operator import itemgetter
+from threading import BoundedSemaphore, Event
+from typing import Iterable, Iterator, NamedTuple, Union
 from time import time
 import random as rm
+import argparse
+import json
+import os
+import sys
 
 
 """
@@ -76,31 +87,33 @@ NAME_OF_BUFFER_PIC_CENTER = {
     ('y', 'r'): 'x'
 }
 
+# shortest found algorithm with the effect of the setup + perm + undo (see algorithm_finder), the effect and so the
+# solution stays the same, only fewer moves are applied
 MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CENTER = {
-    'a': f"{J_PERM_UP}",
+    'a': "F2 L' U' L F2 R' D R' D' R2",
     # 'b': f"",
-    'c': f"{J_PERM_DOWN}",
-    'd': f"{T_PERM}",
-    'e': f"R L F R' {J_PERM_DOWN} R F' L' R'",
-    'f': f"R F R' {J_PERM_DOWN} R F' R'",
-    'g': f"L' R F R' {J_PERM_DOWN} R F' R' L",
-    'h': f"U B' U' {T_PERM} U B U'",
-    'i': f"R2 U' R' F' R' {J_PERM_DOWN} R F R U R2",
-    'j': f"U2 R U2 {T_PERM} U2 R' U2",
-    'k': f"R F R' L' {T_PERM} L R F' R'",
-    'l': f"L' {T_PERM} L",
+    'c': "B2 L U L' B2 R D' R D R2",
+    'd': "U' B2 D L2 U' L2 B2 D' R2 U R2",
+    'e': "F' U F R U' R' F' U' F2 R' F' R",
+    'f': "R' U F' U' R' F R U F U2 R U",
+    'g': "U F' U2 L U B' U F R' U' R B",
+    'h': "F R' D' F' U F2 L' F' D F' U' R",
+    'i': "R B R B' R D2 L' F L D2 R",
+    'j': "R2 F' R F R2 F' B' R F R' B",
+    'k': "R' F R F' L F2 R' F R F2 L'",
+    'l': "R F R2 B' D2 L2 F' L2 B D2 F' R",
     # 'm': f"",
-    'n': f"U B U' {T_PERM} U B' U'",
-    'o': f"D' R F R' L' {T_PERM} L R F' R' D",
-    'p': f"U' F' U {T_PERM} U' F U",
-    'q': f"R2 U R' F' R' {J_PERM_DOWN} R F R U' R2",
-    'r': f"U2 R' U2 {T_PERM} U2 R U2",
-    's': f"D L R' B' R {J_PERM_UP} R' B L' R D'",
-    't': f"L {T_PERM} L'",
-    'u': f"R F2 R' {J_PERM_DOWN} R F2 R'",
-    'v': f"D' R F2 R' {J_PERM_DOWN} R F2 R' D",
-    'w': f"R' B2 R {J_PERM_UP} R' B2 R",
-    'x': f"D R F2 R' {J_PERM_DOWN} R F2 R' D'"
+    'n': "U B U' R U R' U' R' F R2 U' R' U' R U R' F' U B' U'",
+    'o': "R' B U2 R U R' U2 L U' R U R' L' B' R",
+    'p': "B U2 F' U2 R' L' U2 R U R' U2 L U' R U' F U2 B'",
+    'q': "R D2 L B L' D2 R F' R F R",
+    'r': "R2 B R' F R F' B' R2 F R F'",
+    's': "R U2 L' B' L U2 R' F R' F' R",
+    't': "R' B' R2 F D2 L2 B L2 F' D2 B R'",
+    'u': "R2 B2 L' D' L B2 R' U R' U'",
+    'v': "U' B2 L2 F' D' F L2 B' U B'",
+    'w': "R2 F2 L D L' F2 R U' R U",
+    'x': "R2 D B2 U' L2 D L2 B2 U R2 D'"
 }
 
 INDEX_TO_NAME_CENTER = {
@@ -172,49 +185,142 @@ NAME_OF_BUFFER_PIC_CORNER = {
     ('y', 'r', 'b'): 'U'
 }
 
+# shortest found algorithm with the effect of the setup + perm + undo (see algorithm_finder), the effect and so the
+# solution stays the same, only fewer moves are applied
 MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CORNER = {
     # 'A': f"",
-    'B': f"U {J_PERM_UP} U'",
-    'C': f"{Y_PERM}",
-    'D': f"U2 {J_PERM_DOWN} U2",
+    'B': "R2 F' U' F R2 B' D B' D' B2",
+    'C': "R' F' R U R' L' U2 R U R' U2 L U' F R",
+    'D': "L2 D' L' D L' F2 R U' R' F2",
     # 'E': f"",
-    'F': f"F {Y_PERM} F'",
-    'G': f"D R {Y_PERM} R' D'",
-    'H': f"D2 F' {Y_PERM} F D2",
-    'I': f"F R U {J_PERM_UP} U' R' F'",
-    'J': f"R U {J_PERM_UP} U' R'",
-    'K': f"R {Y_PERM} R'",
-    'L': f"D F' {Y_PERM} F D'",
-    'M': f"F' U2 {J_PERM_DOWN} U2 F",
-    'N': f"R' F' U2 {J_PERM_DOWN} U2 F R",
-    'O': f"D' R {Y_PERM} R' D",
-    'P': f"F' {Y_PERM} F",
+    'F': "F2 D R' U R' L' U2 R U R' U2 L U' R2 D' F2",
+    'G': "F' R U R' F2 L D' L D L2 F'",
+    'H': "D' R' U R' L' U2 R U R' U2 L U' R2 D",
+    'I': "U2 B U' B' U2 B F U' B' U F'",
+    'J': "R' F2 L2 D' L' D L' F2 R U'",
+    'K': "B' R F D' R' D B R F' R2 U R",
+    'L': "F2 B' R2 F D' F D F2 R2 B U F2",
+    'M': "L F2 R' D R' D' R2 F2 L' U'",
+    'N': "R' U L' U' L R U2 L' U' L U2",
+    'O': "R2 U L F2 R2 D R D' R F2 R2 L'",
+    'P': "L F' R' D F D' L' F' R F2 U' F'",
     # 'Q': f"",
-    'R': f"R' {Y_PERM} R",
-    'S': f"D' F' {Y_PERM} F D",
-    'T': f"D2 R {Y_PERM} R' D2",
-    'U': f"F2 {Y_PERM} F2",
-    'V': f"D' F2 {Y_PERM} F2 D",
-    'W': f"R2 {Y_PERM} R2",
-    'X': f"D' F2 {Y_PERM} F2 D"
+    'R': "R2 F' R U R' L' U2 R U R' U2 L U' F R2",
+    'S': "R' B2 D B D' B R2 F' U F R'",
+    'T': "D2 F' R U R' L' U2 R U R' U2 L U' F D2",
+    'U': "D R2 B' R B R D' F' R U R' F",
+    'V': "R U R' F2 L D' L D L2 F2",
+    'W': "U' R2 F2 D' F' D F' R2 B U' B' U",
+    'X': "U2 L2 F2 D F D' F L2 B' U B U2"
 }
 
+# every swap algorithm compiled into one sticker permutation, so that a whole setup + perm + undo is a single gather
+# (loaded from the table cache, it is compiled again whenever an algorithm, a move permutation or the code which parses
+# and compiles the moves changes)
+COMPILED_SWAP_CENTER, COMPILED_SWAP_CORNER, COMPILED_R_PERM = cached_table(
+    'old_pochmann_swaps',
+    (MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CENTER, MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CORNER, R_PERM,
+     MOVE_PERMUTATIONS, compile_sources()),
+    lambda: ({letter: compile_moves(move) for letter, move in MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CENTER.items()},
+             {letter: compile_moves(move) for letter, move in MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CORNER.items()},
+             compile_moves(R_PERM))
+)
+
+# number of moves of the algorithm which is applied for a letter of the solution
+ALGORITHM_LENGTH = {
+    letter: len(normalize_moves(move).split())
+    for letter, move in [*MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CENTER.items(),
+                         *MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CORNER.items(), ('Parity', R_PERM)]
+}
+
+
+"""
+CYCLE TRACING:
+
+A swap algorithm only moves a handful of stickers (the buffer, the target and the pieces swapped as a side effect),
+so every compiled algorithm is reduced to the stickers it really moves. trace_old_pochmann reads the stickers of the
+cube once and follows the cycles of the pieces by applying these small swaps, instead of running the whole algorithm
+on the cube and reading the board again after every target.
+"""
+
+# flat index of a sticker, board[side][row][column] -> side * 9 + row * 3 + column
+flat_index = lambda side, row, column: side * 9 + row * 3 + column
+
+# buffer stickers, in the order of the keys of NAME_OF_BUFFER_PIC_CENTER / NAME_OF_BUFFER_PIC_CORNER
+CENTER_BUFFER = (flat_index(0, 1, 2), flat_index(3, 0, 1))
+CORNER_BUFFER = (flat_index(0, 0, 0), flat_index(1, 0, 0), flat_index(4, 0, 0))
+
+# (sticker, center of its side, letter) in the order find_not_set_center checks them
+CENTER_SCAN_ORDER = [
+    (flat_index(side, row, column), flat_index(side, 1, 1), LETTER_BOARD[side][row][column])
+    for side in range(6) for row, column in ((0, 1), (1, 0), (1, 2), (2, 1))
+    if LETTER_BOARD[side][row][column] not in 'bm'
+]
+
+# (sticker, center of its side, letter) in the order find_not_set_corners checks them
+CORNER_SCAN_ORDER = [
+    (flat_index(side, row, column), flat_index(side, 1, 1), LETTER_BOARD[side][row][column])
+    for side, row, column in (
+        (0, 0, 2), (0, 2, 2), (0, 2, 0),
+        (1, 0, 2), (1, 2, 2), (1, 2, 0),
+        (2, 0, 0), (2, 0, 2), (2, 2, 0), (2, 2, 2),
+        (3, 0, 0), (3, 0, 2), (3, 2, 0), (3, 2, 2),
+        (4, 0, 2), (4, 2, 2), (4, 2, 0),
+        (5, 0, 0), (5, 0, 2), (5, 2, 2), (5, 2, 0)
+    )
+]
+
+
+def sparse_swap(permutation: tuple) -> tuple:
+    """
+    reduce a compiled algorithm to the stickers which are moved by it
+    :param permutation: permutation created by compile_moves
+    :return: (moved stickers, where each of them comes from)
+    """
+    moved = tuple(index for index, source in enumerate(permutation) if index != source)
+    return moved, tuple(permutation[index] for index in moved)
+
+
+SPARSE_SWAP_CENTER = {letter: sparse_swap(permutation) for letter, permutation in COMPILED_SWAP_CENTER.items()}
+SPARSE_SWAP_CORNER = {letter: sparse_swap(permutation) for letter, permutation in COMPILED_SWAP_CORNER.items()}
+SPARSE_R_PERM = sparse_swap(COMPILED_R_PERM)
+
+# every piece can be a target at most twice (flipped / twisted in place), more targets means the cube is not solvable
+MAX_TARGETS = 2 * (len(NAME_OF_BUFFER_PIC_CENTER) + len(NAME_OF_BUFFER_PIC_CORNER))
+
 
 # def format_of_instructions(instruction: str) -> str:
 #   """ formats the rubicks qube instruction so that it can be understood by the qube class """
 #   return instruction.upper().replace("'", "’").replace('(', '').replace('(', '').split()
+# the moves of a scramble in the form of POSSIBLE_MOVES, see notation
 
-format_of_instructions = lambda instruction: instruction.upper().replace("'", "’").replace('(', '').replace('(', '').split()
+format_of_instructions = lambda instruction: list(parse_notation(instruction))
 
 
-def timer(func):
-    def inner(*args, **kwargs):
-        s_time = time()
-        rv = func(*args, **kwargs)
-        t_time = time() - s_time
-        print(f'Total Time in s: {t_time}.')
-        return rv
-    return inner
+class ExpandedSolution(NamedTuple):
+    letters: list  # targets (and 'Parity') in the order they are solved
+    moves: list  # the moves which solve the cube, after cancellation
+    raw_move_count: int  # number of moves before cancellation
+
+
+def expand_solution(letters: list, cancel: bool = True) -> ExpandedSolution:
+    """
+    expand the letters of an old pochmann solution into the moves of the swap algorithms
+    :param letters: result of solve_old_pochmann / trace_old_pochmann
+    :param cancel: merge and cancel redundant turns at the boundaries of the algorithms
+    :return: letters, flat list of moves and the number of moves before cancellation
+    """
+    moves = []
+    for letter in letters:
+        if letter == 'Parity':
+            algorithm = R_PERM
+        elif letter.isupper():
+            algorithm = MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CORNER[letter]
+        else:
+            algorithm = MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CENTER[letter]
+        moves += normalize_moves(algorithm).split()
+
+    return ExpandedSolution(letters, cancel_moves(moves) if cancel else moves, len(moves))
 
 
 def create_random_scrambled_cube() -> Cube:
@@ -247,8 +353,16 @@ def create_scrambled_cube(scramble) -> Cube:
     return my_cube
 
 
-@timer
-def solve_old_pochmann(my_cube: Cube) -> list:
+def solve_old_pochmann(my_cube: Cube, expand: bool = False) -> Union[list, ExpandedSolution]:
+    """
+    solve the cube with the old pochmann method, the cube is solved afterwards
+    (the time and moves of every phase are recorded if a collector is set, see instrumentation)
+    :param my_cube: scrambled 3x3x3 cube (colour=True)
+    :param expand: if True return the cancelled moves of the solution as well (see expand_solution)
+    :return: letters of the targets, with 'Parity' between the edges and the corners if the R-Perm is needed
+    """
+    validate_state(my_cube.state)  # an unsolvable cube would send the buffer around forever
+    validate_colour_board(my_cube.state)  # the targets are found by the colours of the centers
     moves = []
 
     def find_not_set_center() -> Union[str, None]:
@@ -256,6 +370,7 @@ def solve_old_pochmann(my_cube: Cube) -> list:
         if the buffer pic is at its target location, check if all center pieces are also at its target locations
         :return: name of first not set center pic which the function found, if there is none return None
         """
+        if record: record.center_rescans += 1
         for index in range(len(my_cube)):
             color_of_face = my_cube.board[index][1][1]
 
@@ -284,12 +399,12 @@ def solve_old_pochmann(my_cube: Cube) -> list:
             else:
                 return
         moves.append(buffer_letter)
-        move = MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CENTER[buffer_letter]
-        my_cube.translate(move)
+        my_cube.apply_permutation(COMPILED_SWAP_CENTER[buffer_letter])
 
         move_center_buffer_to_target_location()
 
     def find_not_set_corners() -> Union[str, None]:
+        if record: record.corner_rescans += 1
         # TOP
         if my_cube.board[0][0][2] != 'w': return 'B'
         if my_cube.board[0][2][2] != 'w': return 'C'
@@ -301,13 +416,13 @@ def solve_old_pochmann(my_cube: Cube) -> list:
         # FRONT
         if my_cube.board[2][0][0] != 'b': return 'I'
         if my_cube.board[2][0][2] != 'b': return 'J'
-        if my_cube.board[2][2][0] != 'b': return 'K'
-        if my_cube.board[2][2][2] != 'b': return 'L'
+        if my_cube.board[2][2][0] != 'b': return 'L'
+        if my_cube.board[2][2][2] != 'b': return 'K'
         # RIGHT
         if my_cube.board[3][0][0] != 'o': return 'M'
         if my_cube.board[3][0][2] != 'o': return 'N'
-        if my_cube.board[3][2][0] != 'o': return 'O'
-        if my_cube.board[3][2][2] != 'o': return 'P'
+        if my_cube.board[3][2][0] != 'o': return 'P'
+        if my_cube.board[3][2][2] != 'o': return 'O'
         # BACK
         if my_cube.board[4][0][2] != 'g': return 'R'
         if my_cube.board[4][2][2] != 'g': return 'S'
@@ -330,20 +445,229 @@ def solve_old_pochmann(my_cube: Cube) -> list:
                 return
 
         moves.append(buffer)
-        move = MOVE_FOR_SWAPPING_BUFFER_WITH_TARGET_CORNER[buffer]
-        my_cube.translate(move)
+        my_cube.apply_permutation(COMPILED_SWAP_CORNER[buffer])
+
+        move_corner_buffer_to_target_location()
+
+    record = instrumentation.begin_solve('solve_old_pochmann')
+    try:
+        move_center_buffer_to_target_location()
+        if record: _record_phases(record, moves, 'edges')
+
+        if len(moves) % 2 != 0:
+            my_cube.apply_permutation(COMPILED_R_PERM)
+            moves.append('Parity')
+        if record: _record_phases(record, moves, 'parity')
 
         move_corner_buffer_to_target_location()
+        if record:
+            _record_phases(record, moves, 'corners')
+            instrumentation.end_solve(record)
+    finally:
+        instrumentation.leave_solve(record)
+
+    return expand_solution(moves) if expand else moves
+
+
+def _record_phases(record: instrumentation.SolveRecord, letters: list, phase: str) -> None:
+    """
+    finish a phase of an instrumented solve
+    :param record: record of the solve
+    :param letters: all letters of the solve up to now
+    :param phase: 'edges', 'parity' or 'corners'
+    """
+    if phase == 'edges':
+        letters = [letter for letter in letters if letter.islower()]
+    elif phase == 'parity':
+        letters = [letter for letter in letters if letter == 'Parity']
+    else:
+        letters = [letter for letter in letters if letter.isupper()]
+    record.end_phase(phase, sum(ALGORITHM_LENGTH[letter] for letter in letters))
 
-    move_center_buffer_to_target_location()
 
-    if len(moves) % 2 != 0:
-        my_cube.translate(R_PERM)
-        moves.append('Parity')
+def trace_old_pochmann(my_cube: Cube, apply_solution: bool = False,
+                       expand: bool = False) -> Union[list, ExpandedSolution]:
+    """
+    solve the cube with the old pochmann method by tracing the cycles of the pieces, the letters are the same as the
+    ones of solve_old_pochmann
+    :param my_cube: scrambled 3x3x3 cube (colour=True)
+    :param apply_solution: if True the cube is solved afterwards, otherwise it is left untouched
+    :param expand: if True return the cancelled moves of the solution as well (see expand_solution)
+    :return: letters of the targets, with 'Parity' between the edges and the corners if the R-Perm is needed
+    """
+    validate_state(my_cube.state)
+    validate_colour_board(my_cube.state)
+    stickers = list(my_cube.state)
+    moves = []
 
-    move_corner_buffer_to_target_location()
+    def swap(moved_and_sources: tuple) -> None:
+        moved, sources = moved_and_sources
+        values = [stickers[source] for source in sources]
+        for index, value in zip(moved, values):
+            stickers[index] = value
+
+    def next_target(buffer: tuple, names: dict, buffer_letters: str, scan_order: list) -> Union[str, None]:
+        letter = names[itemgetter(*buffer)(stickers)]
+        if letter not in buffer_letters:
+            return letter
+        # buffer piece is at its target location, break into the next cycle
+        if record:
+            if scan_order is CENTER_SCAN_ORDER:
+                record.center_rescans += 1
+            else:
+                record.corner_rescans += 1
+        for index, center, target in scan_order:
+            if stickers[index] != stickers[center]:
+                return target
+        return None
+
+    record = instrumentation.begin_solve('trace_old_pochmann')
+    try:
+        for _ in range(MAX_TARGETS):
+            letter = next_target(CENTER_BUFFER, NAME_OF_BUFFER_PIC_CENTER, 'bm', CENTER_SCAN_ORDER)
+            if letter is None:
+                break
+            moves.append(letter)
+            swap(SPARSE_SWAP_CENTER[letter])
+        else:
+            raise ValueError('The edges of the cube can not be solved.')
+        if record: _record_phases(record, moves, 'edges')
+
+        if len(moves) % 2 != 0:
+            swap(SPARSE_R_PERM)
+            moves.append('Parity')
+        if record: _record_phases(record, moves, 'parity')
+
+        for _ in range(MAX_TARGETS):
+            letter = next_target(CORNER_BUFFER, NAME_OF_BUFFER_PIC_CORNER, 'AEQ', CORNER_SCAN_ORDER)
+            if letter is None:
+                break
+            moves.append(letter)
+            swap(SPARSE_SWAP_CORNER[letter])
+        else:
+            raise ValueError('The corners of the cube can not be solved.')
+        if record:
+            _record_phases(record, moves, 'corners')
+            instrumentation.end_solve(record)
+    finally:
+        instrumentation.leave_solve(record)
+
+    if apply_solution:
+        my_cube.state = stickers
+    return expand_solution(moves) if expand else moves
+
+
+def _solve_scramble(job: tuple) -> Union[list, ExpandedSolution, ValueError]:
+    """
+    worker of solve_many, the move tables are module level, so every process builds them once when it imports them
+    :param job: (scramble, expand, return_errors)
+    :return: solution of the scramble, or the error if return_errors is set
+    """
+    scramble, expand, return_errors = job
+    try:
+        return trace_old_pochmann(create_scrambled_cube(scramble), expand=expand)
+    except ValueError as error:
+        if return_errors:
+            return error
+        raise
 
-    return moves
+
+def _call_indexed(task: tuple) -> tuple:
+    function, index, item = task
+    return index, function(item)
+
+
+def _imap_bounded(function, items: Iterable, workers: int, chunksize: int, ordered: bool) -> Iterator:
+    """
+    map a function over a (huge) stream in a process pool, the items are read lazily and only a bounded number of them
+    is in flight at the same time, so the memory stays flat
+    :param function: module level function, it is sent to the workers by reference
+    :param items: iterable of the arguments
+    :param workers: number of processes, 1 calls the function in this process
+    :param chunksize: number of items sent to a worker at once
+    :param ordered: True -> yield (index, result) in input order, False -> in completion order
+    :return: generator of (index, result)
+    """
+    if workers == 1:
+        for index, item in enumerate(items):
+            yield index, function(item)
+        return
+
+    max_in_flight = 4 * workers * chunksize
+    in_flight = BoundedSemaphore(max_in_flight)
+    stopped = Event()
+
+    def bounded_tasks() -> Iterator:
+        # consumed by the task feeding thread of the pool, blocks while too many results are not yet yielded
+        for index, item in enumerate(items):
+            in_flight.acquire()
+            if stopped.is_set():
+                return
+            yield function, index, item
+
+    from multiprocessing import Pool  # the solver itself does not need it, short-lived processes skip the import
+    with Pool(workers) as pool:
+        try:
+            imap = pool.imap if ordered else pool.imap_unordered
+            for result in imap(_call_indexed, bounded_tasks(), chunksize):
+                in_flight.release()
+                yield result
+        finally:
+            # wake up the feeding thread if the caller stopped early
+            stopped.set()
+            for _ in range(max_in_flight):
+                try:
+                    in_flight.release()
+                except ValueError:
+                    break
+
+
+def solve_many(scrambles: Iterable, workers: int = None, chunksize: int = 256, ordered: bool = True,
+               expand: bool = False, return_errors: bool = False) -> Iterator:
+    """
+    solve a (huge) stream of scrambles in a process pool, the scrambles are read lazily and only a bounded number of
+    them is in flight at the same time, so the memory stays flat.
+    The cubes are solved with trace_old_pochmann (same letters as solve_old_pochmann, without printing the time).
+    :param scrambles: iterable of scrambles in cube notation
+    :param workers: number of processes, default os.cpu_count(), 1 solves in this process
+    :param chunksize: number of scrambles sent to a worker at once
+    :param ordered: True -> yield the solutions in input order, False -> yield (index, solution) in completion order
+    :param expand: yield ExpandedSolution instead of letters
+    :param return_errors: yield the ValueError of an invalid scramble instead of raising it
+    :return: generator of the solutions
+    """
+    jobs = ((scramble, expand, return_errors) for scramble in scrambles)
+    results = _imap_bounded(_solve_scramble, jobs, workers or os.cpu_count() or 1, chunksize, ordered)
+    if ordered:
+        for _, solution in results:
+            yield solution
+    else:
+        yield from results
+
+
+def _solve_line(numbered_line: tuple) -> dict:
+    """
+    worker of main, solve one line of a scramble file
+    :param numbered_line: (line number, line)
+    :return: JSON serializable result, with the key 'error' if the scramble is invalid
+    """
+    number, line = numbered_line
+    scramble = line.strip()
+    try:
+        s_time = time()
+        solution = trace_old_pochmann(create_scrambled_cube(scramble), expand=True)
+        t_time = time() - s_time
+    except ValueError as error:
+        return {'line': number, 'scramble': scramble, 'error': str(error)}
+
+    return {
+        'line': number,
+        'scramble': scramble,
+        'letters': [letter for letter in solution.letters if letter != 'Parity'],
+        'moves': ' '.join(solution.moves),
+        'parity': 'Parity' in solution.letters,
+        'time': t_time
+    }
 
 
 def solution_schedule() -> None:
@@ -353,16 +677,64 @@ def solution_schedule() -> None:
     if user_input == 'r': my_cool_cube = create_random_scrambled_cube()
 
     else:
-        scramble = format_of_instructions(input('Enter your scramble: '))
-        for char in scramble:
+        scramble = input('Enter your scramble: ')
+        for char in format_of_instructions(scramble):
             if char not in POSSIBLE_MOVES:
                 raise ValueError('Неизвестная манипуляция.')  # f'Scramble move unknown. [UNKNOWN MOVE >>{element}<<]'
         my_cool_cube = create_scrambled_cube(scramble)
 
     print(f'\nScrambled Cube:\n\n{str(my_cool_cube)}\n')
-    print(f'Solution:{solve_old_pochmann(my_cool_cube)}\n')
+    timing = instrumentation.CallbackCollector(lambda record: print(f'Total Time in s: {record["total_time"]}.'))
+    with instrumentation.collecting(timing):
+        print(f'Solution:{solve_old_pochmann(my_cool_cube)}\n')
     print(f'\nSolved Cube:\n\n{str(my_cool_cube)}\n')
 
 
+def _non_negative_int(text: str) -> int:
+    """
+    argparse type of counts where 0 has a meaning of its own, e.g. --workers 0 for one process per cpu
+    """
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid int value: {text!r}') from None
+    if value < 0: raise argparse.ArgumentTypeError(f'has to be 0 or more, not {value}')
+    return value
+
+
+def main(argv: list = None) -> int:
+    """
+    command line entry point, solve a file (or stdin) with one scramble per line and write one JSON object per line to
+    stdout, lines with invalid scrambles get an 'error' instead of a solution
+    :param argv: command line arguments, default sys.argv[1:]
+    :return: exit code, 1 if at least one line was invalid
+    """
+    parser = argparse.ArgumentParser(description='Solve Rubik’s Cube scrambles with the old pochmann method.')
+    parser.add_argument('input', nargs='?', default='-', help='file with one scramble per line, - for stdin')
+    parser.add_argument('-w', '--workers', type=_non_negative_int, default=1, help='number of processes, 0 for one per cpu')
+    parser.add_argument('-c', '--chunksize', type=int, default=256, help='lines sent to a worker at once')
+    parser.add_argument('-u', '--unordered', action='store_true', help='write the results in completion order')
+    parser.add_argument('-i', '--interactive', action='store_true', help='ask for a single scramble')
+    args = parser.parse_args(argv)
+
+    if args.interactive or (argv is None and len(sys.argv) == 1 and sys.stdin.isatty()):
+        solution_schedule()
+        return 0
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    failed = False
+    try:
+        lines = ((number, line) for number, line in enumerate(source, 1) if line.strip())
+        workers = args.workers or os.cpu_count() or 1
+        for _, result in _imap_bounded(_solve_line, lines, workers, args.chunksize, not args.unordered):
+            failed = failed or 'error' in result
+            sys.stdout.write(json.dumps(result, ensure_ascii=False) + '\n')
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    sys.stdout.flush()
+    return 1 if failed else 0
+
+
 if __name__ == '__main__':
-    solution_schedule()
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+Rubik's Cube Solver
+Copyright (C) 2021  Felix Drees
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+How to contact me by electronic and/or paper mail:
+  https://github.com/felix-drees
+"""
+
+"""
+UNIFORM RANDOM STATES:
+
+A few random moves only reach cubes near the solved one. Every legal cube is equally likely if the pieces are drawn
+directly: random corner and edge permutations with the same parity, random orientations of all but the last corner /
+edge (the last one makes the sum of the twists a multiple of 3 and the sum of the flips even).
+
+EXAMPLE OF USE:
+
+my_cube = create_uniform_scrambled_cube(seed=2021)
+scramble = uniform_scramble(seed=2021)  # moves which lead to the same cube (two-phase solver, inverted)
+
+cubes = BatchCube(states=random_states(1_000_000, seed=2021))
+keys = random_keys(1_000_000, seed=2021)  # the same cubes as (N, 9) keys, see encoding
+"""
+
+from Cube import CubeObj as Cube, invert_moves
+from cubie import CubieCube, CORNER_FACELETS, EDGE_FACELETS, CORNER_FACES, EDGE_FACES
+from encoding import N_TWIST, N_FLIP, encode_coordinates, to_permutation
+from kociemba import solve_kociemba
+from math import factorial
+from typing import Union
+import numpy as np
+import random as rm
+
+
+def _parity(permutation: list) -> int:
+    return sum(1 for i in range(len(permutation)) for j in range(i + 1, len(permutation))
+               if permutation[i] > permutation[j]) % 2
+
+
+def random_cubie(rng: rm.Random = rm) -> CubieCube:
+    """
+    draw a cubie cube, every legal cube with the same probability
+    :param rng: source of randomness, e.g. random.Random(seed)
+    :return: the cubie cube
+    """
+    cp, ep = rng.sample(range(8), 8), rng.sample(range(12), 12)
+    if _parity(cp) != _parity(ep):
+        ep[0], ep[1] = ep[1], ep[0]  # one-to-one between the cubes with wrong and right parity, stays uniform
+    co = [rng.randrange(3) for _ in range(7)]
+    eo = [rng.randrange(2) for _ in range(11)]
+    return CubieCube(tuple(cp), tuple(co + [-sum(co) % 3]), tuple(ep), tuple(eo + [sum(eo) % 2]))
+
+
+def create_uniform_scrambled_cube(seed=None, colour: bool = True) -> Cube:
+    """
+    create a uniformly random cube
+    :param seed: seed of the random numbers, None for a different cube every time
+    :param colour: True for a cube with colours, False for letters
+    :return: the cube as an object
+    """
+    my_cube = Cube(3, colour)
+    my_cube.apply_permutation(to_permutation(random_cubie(rm.Random(seed))))
+    return my_cube
+
+
+def uniform_scramble(seed=None, max_length: int = 24, timeout: float = 10.0) -> str:
+    """
+    create the scramble of a uniformly random cube (the inverted two-phase solution of the cube)
+    :param seed: seed of the random numbers, None for a different scramble every time
+    :param max_length: maximal number of moves, a TimeoutError if no scramble this short is found within the timeout
+    :param timeout: see solve_kociemba
+    :return: moves of POSSIBLE_MOVES separated by spaces, create_scrambled_cube(scramble) gives the cube of the seed
+    """
+    moves = solve_kociemba(create_uniform_scrambled_cube(seed), max_length, timeout)
+    if len(moves) > max_length: raise TimeoutError(f'No scramble with at most {max_length} moves found in {timeout} s.')
+    return ' '.join(invert_moves(moves))
+
+
+"""
+BATCH:
+"""
+
+
+def _random_coordinates(n: int, seed) -> tuple:
+    """
+    draw the coordinates of many cubes, the permutations as Lehmer codes (digit i is the number of smaller pieces
+    after position i), so their ranks and parities are sums instead of comparisons of all pairs
+    (all arrays have one row per piece and one column per cube, numpy works along contiguous rows)
+    :return: corner digits (8, N), twist (N,), edge digits (12, N), flip (N,)
+    """
+    rng = np.random.default_rng(seed)
+    corner_digits = rng.integers(0, np.arange(8, 0, -1)[:, np.newaxis], (8, n), dtype=np.uint8)
+    edge_digits = rng.integers(0, np.arange(12, 0, -1)[:, np.newaxis], (12, n), dtype=np.uint8)
+    # the parity of a permutation is the parity of the sum of its digits, flipping the digit with two values swaps
+    # the last two edges: one-to-one between the cubes with wrong and right parity, stays uniform
+    edge_digits[10] ^= ((corner_digits.sum(axis=0) + edge_digits.sum(axis=0)) % 2).astype(np.uint8)
+    return corner_digits, rng.integers(0, N_TWIST, n), edge_digits, rng.integers(0, N_FLIP, n)
+
+
+def _permutations_of_digits(digits: np.ndarray) -> np.ndarray:
+    """
+    :param digits: (n, N) Lehmer codes
+    :return: (n, N) permutations
+    """
+    permutations = digits.copy()
+    for index in range(len(digits) - 2, -1, -1):
+        # the pieces behind position index skip its piece
+        permutations[index + 1:] += permutations[index + 1:] >= permutations[index]
+    return permutations
+
+
+def _orientations(coordinate: np.ndarray, base: int, size: int) -> np.ndarray:
+    """
+    :return: (size, N) orientations of the coordinate (twist or flip), the last one completes the sum
+    """
+    orientations = np.empty((size, len(coordinate)), dtype=np.uint8)
+    for index in range(size - 2, -1, -1):
+        coordinate, orientations[index] = np.divmod(coordinate, base)
+    orientations[-1] = (base - orientations[:-1].sum(axis=0) % base) % base
+    return orientations
+
+
+def _random_pieces(n: int, seed) -> tuple:
+    corner_digits, twist, edge_digits, flip = _random_coordinates(n, seed)
+    return (_permutations_of_digits(corner_digits), _orientations(twist, 3, 8),
+            _permutations_of_digits(edge_digits), _orientations(flip, 2, 12))
+
+
+def random_cubie_arrays(n: int, seed: Union[int, np.random.Generator] = None) -> tuple:
+    """
+    draw many cubie cubes at once, every legal cube with the same probability
+    :param n: number of cubes
+    :param seed: seed or numpy random generator
+    :return: cp (N, 8), co (N, 8), ep (N, 12), eo (N, 12) uint8 arrays
+    """
+    return tuple(array.T for array in _random_pieces(n, seed))
+
+
+_CORNER_FACES = np.ravel(CORNER_FACES).astype(np.uint8)
+_EDGE_FACES = np.ravel(EDGE_FACES).astype(np.uint8)
+# random_states builds the corner stickers, the edge stickers and the centers, this puts them in the order of the state
+_STICKER_ORDER = np.argsort(np.concatenate([np.ravel(CORNER_FACELETS), np.ravel(EDGE_FACELETS), np.arange(4, 54, 9)]))
+
+
+def random_states(n: int, seed: Union[int, np.random.Generator] = None) -> np.ndarray:
+    """
+    draw many uniformly random cubes as stickers
+    :param n: number of cubes
+    :param seed: seed or numpy random generator
+    :return: (N, 54) uint8 array of side indices, the format of BatchCube
+    """
+    cp, co, ep, eo = _random_pieces(n, seed)
+    # side of the sticker with offset k of the piece at a position: FACES[piece][k - orientation]
+    corner_stickers = 3 * cp[:, np.newaxis] + (np.arange(3, 6, dtype=np.uint8)[:, np.newaxis] - co[:, np.newaxis]) % 3
+    edge_stickers = 2 * ep[:, np.newaxis] + (np.arange(2, dtype=np.uint8)[:, np.newaxis] + eo[:, np.newaxis]) % 2
+    stickers = np.vstack([np.take(_CORNER_FACES, corner_stickers.reshape(24, n)),
+                          np.take(_EDGE_FACES, edge_stickers.reshape(24, n)),
+                          np.repeat(np.arange(6, dtype=np.uint8)[:, np.newaxis], n, axis=1)])
+    return np.ascontiguousarray(stickers[_STICKER_ORDER].T)
+
+
+def random_keys(n: int, seed: Union[int, np.random.Generator] = None) -> np.ndarray:
+    """
+    draw many uniformly random cubes as compact keys, without building the stickers
+    :param n: number of cubes
+    :param seed: seed or numpy random generator, the same seed gives the cubes of random_states
+    :return: (N, 9) uint8 array, see encoding
+    """
+    corner_digits, twist, edge_digits, flip = _random_coordinates(n, seed)
+    corners = np.array([factorial(7 - index) for index in range(8)]) @ corner_digits.astype(np.int64)
+    edges = np.array([factorial(11 - index) for index in range(12)]) @ edge_digits.astype(np.int64)
+    return encode_coordinates(corners, twist, edges, flip)
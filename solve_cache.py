@@ -0,0 +1,214 @@
+"""
+Rubik's Cube Solver
+Copyright (C) 2021  Felix Drees
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+How to contact me by electronic and/or paper mail:
+  https://github.com/felix-drees
+"""
+
+"""
+SYMMETRY REDUCED SOLVE CACHE:
+
+The cube has 48 symmetries: the 24 rotations of the whole cube, each with or without a mirror. Looking at a scrambled
+cube through a symmetry (and renaming the colours, so the centers stay where they are) gives another scrambled cube
+which is solved by the same moves looked at through the same symmetry (R becomes e.g. U, or L’ for a mirror).
+
+The cache stores one solution per class of 48 symmetric cubes, under the smallest key of the class. A cube which is
+(symmetric to) a cube solved before is answered from the cache, the moves are mapped back through the symmetry.
+
+EXAMPLE OF USE:
+
+cache = SolveCache(maxsize=100_000)  # solve_old_pochmann, or SolveCache(solve_kociemba)
+for scramble in scrambles:
+    print(cache.solve(create_scrambled_cube(scramble)))
+print(cache.stats())
+"""
+
+from Cube import CubeObj as Cube, MOVE_PERMUTATIONS, COLOR_BOARD, LETTER_BOARD, compose, inverse_permutation, \
+    sticker_positions
+from cubie import CORNER_FACELETS, EDGE_FACELETS, from_state
+from encoding import to_permutation
+from old_pochmann import solve_old_pochmann
+from collections import OrderedDict
+from itertools import permutations, product
+from operator import itemgetter
+from typing import Callable
+
+
+"""
+SYMMETRIES:
+"""
+
+
+def _symmetry_permutations() -> list:
+    """
+    create the sticker permutation of every symmetry, one for every signed permutation of the three axes
+    :return: list of (permutation, is mirror), new_state[i] = old_state[permutation[i]], the identity first
+    """
+    positions = sticker_positions(3)
+    index_of_position = {position: index for index, position in enumerate(positions)}
+    symmetries = []
+    for axes in permutations(range(3)):
+        for signs in product((1, -1), repeat=3):
+            inversions = sum(1 for i in range(3) for j in range(i + 1, 3) if axes[i] > axes[j])
+            mirror = (-1) ** inversions * signs[0] * signs[1] * signs[2] < 0
+            symmetries.append((tuple(index_of_position[tuple(sign * position[axis] for axis, sign in zip(axes, signs))]
+                                     for position in positions), mirror))
+    return symmetries
+
+
+def _move_maps(symmetry: tuple) -> dict:
+    """
+    :param symmetry: sticker permutation of a symmetry
+    :return: move -> the move seen through the symmetry
+    """
+    move_of_permutation = {permutation: move for move, permutation in MOVE_PERMUTATIONS.items()}
+    inverse = inverse_permutation(symmetry)
+    return {move: move_of_permutation[compose(compose(inverse, permutation), symmetry)]
+            for move, permutation in MOVE_PERMUTATIONS.items()}
+
+
+SYMMETRIES, MIRRORS = map(list, zip(*_symmetry_permutations()))
+INVERSE_SYMMETRIES = [inverse_permutation(symmetry) for symmetry in SYMMETRIES]
+
+# MOVE_MAPS[s][move]: the move seen through symmetry s, INVERSE_MOVE_MAPS[s] undoes it
+MOVE_MAPS = [_move_maps(symmetry) for symmetry in SYMMETRIES]
+INVERSE_MOVE_MAPS = [{mapped: move for move, mapped in move_map.items()} for move_map in MOVE_MAPS]
+
+# the sticker at the first facelet of every piece position identifies the whole cube
+_REFERENCE_FACELETS = [facelets[0] for facelets in CORNER_FACELETS + EDGE_FACELETS]
+_KEY_GATHERS = [itemgetter(*[symmetry[facelet] for facelet in _REFERENCE_FACELETS]) for symmetry in SYMMETRIES]
+
+
+def _source_lookup() -> dict:
+    """
+    :return: stickers of a piece (colours or letters) -> the facelets of the solved cube they come from
+    """
+    lookup = {}
+    for board in (COLOR_BOARD, LETTER_BOARD):
+        solved = [sticker for side in board for row in side for sticker in row]
+        for facelets in CORNER_FACELETS + EDGE_FACELETS:
+            for turn in range(len(facelets)):
+                sources = facelets[turn:] + facelets[:turn]
+                lookup[tuple(solved[source] for source in sources)] = sources
+    return lookup
+
+
+_SOURCES = _source_lookup()
+_PIECE_GATHERS = [(facelets, itemgetter(*facelets)) for facelets in CORNER_FACELETS + EDGE_FACELETS]
+
+
+def _permutation_of_state(state: tuple) -> list:
+    """
+    :param state: flat state of a 3x3x3 CubeObj (colours or letters)
+    :return: sticker permutation which turns the solved cube into this one
+    """
+    permutation = list(range(54))
+    try:
+        for facelets, gather in _PIECE_GATHERS:
+            for facelet, source in zip(facelets, _SOURCES[gather(state)]):
+                permutation[facelet] = source
+    except KeyError:
+        return list(to_permutation(from_state(state)))  # moved centers, raises ValueError for impossible stickers
+    return permutation
+
+
+def canonical_key(state: tuple) -> tuple:
+    """
+    find the smallest key of all cubes symmetric to this one
+    :param state: flat state of a 3x3x3 CubeObj (colours or letters)
+    :return: key (bytes), index of the symmetry which turns the cube into the cube of the key
+    """
+    return _canonical_key(_permutation_of_state(state))
+
+
+def _canonical_key(permutation: list) -> tuple:
+    """
+    :param permutation: see _permutation_of_state
+    :return: see canonical_key
+    """
+    return min((bytes(itemgetter(*gather(permutation))(inverse)), symmetry)
+               for symmetry, (gather, inverse) in enumerate(zip(_KEY_GATHERS, INVERSE_SYMMETRIES)))
+
+
+"""
+CACHE:
+"""
+
+
+def _solve_old_pochmann(my_cube: Cube) -> list:
+    return solve_old_pochmann(my_cube, expand=True).moves
+
+
+class SolveCache:
+    """
+    bounded LRU cache of solutions in front of a solver, keyed by the symmetry reduced state
+    """
+
+    def __init__(self, solver: Callable[[Cube], list] = None, maxsize: int = 100_000) -> None:
+        """
+        :param solver: function cube -> moves of POSSIBLE_MOVES which solve it, default solve_old_pochmann
+        :param maxsize: number of stored solutions, the least recently used one is dropped first
+        """
+        if maxsize < 1: raise ValueError('The cache needs room for at least one solution.')
+        self._solver = solver or _solve_old_pochmann
+        self._maxsize = maxsize
+        self._solutions = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._solutions)
+
+    def solve(self, my_cube: Cube) -> list:
+        """
+        solve a cube with the cache, the cube itself is not changed
+        :param my_cube: scrambled 3x3x3 cube (colours or letters)
+        :return: moves of POSSIBLE_MOVES which solve it
+        """
+        permutation = _permutation_of_state(my_cube.state)
+        key, symmetry = _canonical_key(permutation)
+        solution = self._solutions.get(key)
+
+        if solution is not None:
+            self.hits += 1
+            self._solutions.move_to_end(key)
+        else:
+            self.misses += 1
+            copy = Cube(3)  # the same cube in the colours of COLOR_BOARD, the solvers read the colours
+            copy.apply_permutation(tuple(permutation))
+            move_map = MOVE_MAPS[symmetry]
+            solution = [move_map[move] for move in self._solver(copy)]
+            self._solutions[key] = solution
+            if len(self._solutions) > self._maxsize:
+                self._solutions.popitem(last=False)
+                self.evictions += 1
+
+        inverse_move_map = INVERSE_MOVE_MAPS[symmetry]
+        return [inverse_move_map[move] for move in solution]
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._solutions),
+            'hit_rate': self.hits / requests if requests else 0.0
+        }
+
+    def clear(self) -> None:
+        self._solutions.clear()
+        self.hits = self.misses = self.evictions = 0
@@ -0,0 +1,414 @@
+"""
+Rubik's Cube Solver
+Copyright (C) 2021  Felix Drees
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+How to contact me by electronic and/or paper mail:
+  https://github.com/felix-drees
+"""
+
+"""
+SOLVE SERVICE:
+
+An asyncio server which solves scrambles with the old pochmann method. Requests wait in a bounded queue and are
+collected into micro batches (up to max_batch_size requests, or whatever arrived within max_wait seconds), every batch
+is solved by one call in a process pool, so the event loop never blocks and the pool is not flooded with tiny tasks.
+
+A full queue rejects new requests at once (HTTP 503) instead of letting the latency grow without bound, a request
+which is not answered within its timeout gets HTTP 504 and is skipped if it was not solved yet.
+
+HTTP (one request per connection, JSON):
+    POST /solve    {"scramble": "R U R’ U’"}  ->  {"letters": [...], "moves": [...]}
+    GET  /metrics  queue depth, counters, batch sizes and latency percentiles
+
+EXAMPLE OF USE:
+
+python3 solve_service.py --port 8080 --max-batch-size 64 --max-wait 0.005
+
+async def main():
+    async with SolveService(max_batch_size=64, max_wait=0.005) as service:
+        server = await start_http_server(service, port=8080)
+        status, answer = await http_request('127.0.0.1', 8080, 'POST', '/solve', {'scramble': "R U R' U'"})
+"""
+
+from old_pochmann import create_scrambled_cube, trace_old_pochmann
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from time import perf_counter
+from typing import Union
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+
+
+# latencies of the last requests, the percentiles of the metrics are taken over this window
+LATENCY_WINDOW = 10_000
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+class ServiceOverloaded(Exception):
+    """
+    the queue of the service is full, the request was not accepted
+    """
+
+
+class ServiceStopped(Exception):
+    """
+    the service was stopped before the request was solved
+    """
+
+
+def solve_batch(scrambles: list) -> list:
+    """
+    solve a batch of scrambles, runs in a worker of the pool
+    :param scrambles: scrambles in cube notation
+    :return: one dictionary per scramble, {'letters', 'moves'} or {'error'} for an invalid scramble
+    """
+    results = []
+    for scramble in scrambles:
+        try:
+            solution = trace_old_pochmann(create_scrambled_cube(scramble), expand=True)  # letters of solve_old_pochmann
+        except ValueError as error:
+            results.append({'error': str(error)})
+            continue
+        results.append({'letters': solution.letters, 'moves': solution.moves})
+    return results
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class SolveService:
+    """
+    micro batching queue in front of a pool of solver processes
+    """
+
+    def __init__(self, max_batch_size: int = 64, max_wait: float = 0.005, max_queue: int = 1024,
+                 timeout: float = 5.0, executor: Executor = None, max_concurrent_batches: int = None) -> None:
+        """
+        :param max_batch_size: most requests solved by one call of the pool
+        :param max_wait: seconds a batch waits for more requests after its first one
+        :param max_queue: most waiting requests, further requests raise ServiceOverloaded
+        :param timeout: seconds until a request raises asyncio.TimeoutError
+        :param executor: pool which runs solve_batch, default a ProcessPoolExecutor owned by the service
+        :param max_concurrent_batches: batches in the pool at the same time, default the number of CPUs
+        """
+        if max_batch_size < 1: raise ValueError('A batch needs room for at least one request.')
+        if max_queue < 1: raise ValueError('The queue needs room for at least one request.')
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._max_concurrent_batches = max_concurrent_batches or os.cpu_count() or 1
+
+        self._queue = None
+        self._batcher = None
+        self._collecting = []  # requests taken from the queue for the next batch, answered by stop if it is cancelled
+        self._running_batches = set()
+
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._batch_sizes = deque(maxlen=LATENCY_WINDOW)
+        self.requests = self.completed = self.rejected = self.timeouts = self.errors = self.batches = 0
+
+    async def __aenter__(self) -> 'SolveService':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def start(self) -> None:
+        if self._batcher is not None: raise ValueError('The service is already running.')
+        if self._executor is None:
+            # forked workers would inherit the open client connections, which then never see the end of the answer
+            self._executor = ProcessPoolExecutor(self._max_concurrent_batches, multiprocessing.get_context('spawn'))
+        self._queue = asyncio.Queue(self.max_queue)
+        self._batcher = asyncio.create_task(self._collect_batches())
+
+    async def stop(self) -> None:
+        """
+        stop taking batches, wait for the running ones and shut down an own pool, the requests which are not in a
+        running batch raise ServiceStopped
+        """
+        if self._batcher is None:
+            return
+        self._batcher.cancel()
+        try:
+            await self._batcher
+        except asyncio.CancelledError:
+            pass
+        self._batcher = None
+        if self._running_batches:
+            await asyncio.wait(self._running_batches)
+        waiting, self._collecting = self._collecting, []
+        while not self._queue.empty():
+            waiting.append(self._queue.get_nowait())
+        for _, future, _ in waiting:
+            if not future.done():
+                future.set_exception(ServiceStopped('The service stopped before the request was solved.'))
+        if self._owns_executor:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def solve(self, scramble: str, timeout: float = None) -> dict:
+        """
+        solve a scramble in one of the next batches
+        :param scramble: moves in cube notation
+        :param timeout: seconds, default the timeout of the service
+        :return: {'letters', 'moves'} of solve_old_pochmann(..., expand=True), or {'error'} for an invalid scramble
+                 (ServiceOverloaded for a full queue, ServiceStopped if the service stops before the request is solved)
+        """
+        if self._batcher is None: raise ValueError('The service is not running.')
+        if not isinstance(scramble, str): raise ValueError('Scramble has to be str.')
+        self.requests += 1
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((scramble, future, perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise ServiceOverloaded(f'More than {self.max_queue} requests are waiting.') from None
+
+        try:
+            return await asyncio.wait_for(future, self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1  # the future is cancelled now, a batch which did not start yet skips the request
+            raise
+
+    async def _collect_batches(self) -> None:
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self._max_concurrent_batches)
+        while True:
+            await slots.acquire()
+            batch = self._collecting = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            batch = [request for request in batch if not request[1].done()]  # drop requests which timed out
+            self._collecting = []
+            if not batch:
+                slots.release()
+                continue
+            task = asyncio.create_task(self._run_batch(batch))
+            self._running_batches.add(task)
+            task.add_done_callback(self._running_batches.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _run_batch(self, batch: list) -> None:
+        self.batches += 1
+        self._batch_sizes.append(len(batch))
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._executor, solve_batch, [scramble for scramble, _, _ in batch])
+        except Exception as error:  # e.g. a crashed worker, every request of the batch gets the error
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+            self.errors += len(batch)
+            return
+
+        now = perf_counter()
+        for (_, future, enqueued), result in zip(batch, results):
+            if future.done():
+                continue
+            future.set_result(result)
+            self.completed += 1
+            if 'error' in result:
+                self.errors += 1
+            self._latencies.append(now - enqueued)
+
+    def metrics(self) -> dict:
+        """
+        :return: queue depth, counters, mean batch size and latency percentiles (seconds) of the last requests
+        """
+        latencies = sorted(self._latencies)
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'running_batches': len(self._running_batches),
+            'requests': self.requests,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'batches': self.batches,
+            'mean_batch_size': sum(self._batch_sizes) / len(self._batch_sizes) if self._batch_sizes else 0.0,
+            'latency_p50': _percentile(latencies, 0.5),
+            'latency_p90': _percentile(latencies, 0.9),
+            'latency_p99': _percentile(latencies, 0.99)
+        }
+
+
+"""
+HTTP:
+"""
+
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+            500: 'Internal Server Error', 503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+
+async def _read_request(reader: asyncio.StreamReader) -> tuple:
+    """
+    :return: method, path, body of an HTTP/1.1 request
+    """
+    request_line, *header_lines = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    method, path, _ = request_line.split(' ', 2)
+    headers = {}
+    for line in header_lines:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if length > MAX_BODY_BYTES:
+        raise OverflowError
+    return method, path, await reader.readexactly(length) if length else b''
+
+
+async def _answer(service: SolveService, method: str, path: str, body: bytes) -> tuple:
+    """
+    :return: status, JSON answer
+    """
+    if path == '/metrics':
+        if method != 'GET': return 405, {'error': 'Use GET.'}
+        return 200, service.metrics()
+    if path != '/solve':
+        return 404, {'error': f'Unknown path: {path}.'}
+    if method != 'POST':
+        return 405, {'error': 'Use POST.'}
+
+    try:
+        scramble = json.loads(body)['scramble']
+        if not isinstance(scramble, str): raise TypeError
+    except (ValueError, KeyError, TypeError):
+        return 400, {'error': 'The body has to be JSON like {"scramble": "R U R’ U’"}.'}
+
+    try:
+        result = await service.solve(scramble)
+    except ValueError as error:  # the service is not running
+        return 503, {'error': str(error)}
+    except (ServiceOverloaded, ServiceStopped) as error:
+        return 503, {'error': str(error)}
+    except asyncio.TimeoutError:
+        return 504, {'error': 'The solve timed out.'}
+    return (400 if 'error' in result else 200), result
+
+
+async def _handle_connection(service: SolveService, reader: asyncio.StreamReader,
+                             writer: asyncio.StreamWriter) -> None:
+    try:
+        try:
+            status, answer = await _answer(service, *await _read_request(reader))
+        except OverflowError:
+            status, answer = 413, {'error': f'The body has more than {MAX_BODY_BYTES} bytes.'}
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            status, answer = 400, {'error': 'Malformed HTTP request.'}
+        except Exception as error:
+            status, answer = 500, {'error': repr(error)}
+
+        payload = json.dumps(answer, ensure_ascii=False).encode('utf-8')
+        writer.write(f'HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json; charset=utf-8\r\n'
+                     f'Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n'.encode('latin-1') + payload)
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_http_server(service: SolveService, host: str = '127.0.0.1', port: int = 8080,
+                            path: str = None) -> asyncio.AbstractServer:
+    """
+    serve the service over HTTP
+    :param service: running service
+    :param host: address of the TCP socket
+    :param port: port of the TCP socket, 0 for any free port
+    :param path: path of a unix socket, used instead of host and port if given
+    :return: the asyncio server, close it to stop serving
+    """
+    def handler(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        return _handle_connection(service, reader, writer)
+
+    if path is not None:
+        return await asyncio.start_unix_server(handler, path)
+    return await asyncio.start_server(handler, host, port)
+
+
+async def http_request(host: str, port: int, method: str, path: str, payload: dict = None,
+                       unix_path: str = None) -> tuple:
+    """
+    minimal client for the service, e.g. for tests and scripts
+    :param payload: JSON body of the request
+    :param unix_path: path of a unix socket, used instead of host and port if given
+    :return: status, JSON answer
+    """
+    if unix_path is not None:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+                 f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode('latin-1') + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+
+    head, _, answer = response.partition(b'\r\n\r\n')
+    return int(head.split(b' ', 2)[1]), json.loads(answer)
+
+
+async def serve(host: str, port: int, path: Union[str, None], **service_options) -> None:
+    async with SolveService(**service_options) as service:
+        server = await start_http_server(service, host, port, path)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description='Serve old pochmann solves over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--unix', help='path of a unix socket, instead of host and port')
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait', type=float, default=0.005, help='seconds a batch waits for more requests')
+    parser.add_argument('--max-queue', type=int, default=1024, help='waiting requests before answering 503')
+    parser.add_argument('--timeout', type=float, default=5.0, help='seconds before answering 504')
+    parser.add_argument('--workers', type=int, default=None, help='solver processes, default the number of CPUs')
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, max_batch_size=args.max_batch_size,
+                          max_wait=args.max_wait, max_queue=args.max_queue, timeout=args.timeout,
+                          max_concurrent_batches=args.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
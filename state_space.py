@@ -0,0 +1,384 @@
+"""
+Rubik's Cube Solver
+Copyright (C) 2021  Felix Drees
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+How to contact me by electronic and/or paper mail:
+  https://github.com/felix-drees
+"""
+
+"""
+STATE SPACE:
+
+Every cube up to a depth (the number of moves of POSSIBLE_MOVES from the solved cube), found by a breadth-first search
+which keeps its levels on disk. A level is one file of records (9 byte key, see encoding, and the index of the last
+move in POSSIBLE_MOVES), sorted by the key:
+
+state_space.json    format, version, the last finished depth, the number of cubes of every depth and the progress of
+                    the level which is expanded at the moment
+level_00.bin ..     the cubes of every depth
+runs/               sorted runs of the level which is expanded at the moment
+
+The cubes of a level are expanded chunk by chunk (no move of the same side as the last move, of two opposite sides only
+the first one in FACE_OF_MOVE order), the children are sorted and written as runs. The runs are merged block by block,
+duplicates and the cubes of the two levels before (the only other levels a move can reach) are dropped while all files
+are read once from the start to the end. The memory only depends on the chunk, run and block sizes, not on the depth.
+The progress is saved after every run, a stopped search continues where it stopped.
+
+Depth:   0  1    2     3      4        5          6            7              8
+Cubes:   1  18   243   3240   43239    574908     7618438      100803036      1332343288
+
+EXAMPLE OF USE:
+
+counts = enumerate_states('states', max_depth=6)  # again with the same path to continue after a stop
+space = StateSpace('states')
+print(space.counts, space.keys(5)[:3])
+for scramble in space.sample(5, count=10, seed=2021):
+    my_cube = create_scrambled_cube(' '.join(scramble))  # exactly 5 moves from the solved cube
+"""
+
+from Cube import CubeObj as Cube, POSSIBLE_MOVES, FACE_OF_MOVE, AXIS_OF_FACE, inverse_move
+from cubie import MOVE_CUBIES
+from encoding import KEY_BYTES, decode_keys, encode_cubies
+from typing import Callable, Iterator
+import argparse
+import json
+import numpy as np
+import os
+
+
+FORMAT = 'rubiks-cube-state-space'
+VERSION = 1
+
+HEADER_FILE = 'state_space.json'
+RUNS_DIRECTORY = 'runs'
+
+# key and index of the last move in POSSIBLE_MOVES (NO_MOVE for the solved cube)
+RECORD = np.dtype([('key', f'S{KEY_BYTES}'), ('move', np.uint8)])
+NO_MOVE = 255
+
+# cubes expanded at once, the cubes of a run before it is sorted and written, records of every run per merge step
+CHUNK_SIZE = 16_384
+RUN_SIZE = 4_194_304
+MERGE_BLOCK = 65_536
+
+
+def _allowed_moves() -> np.ndarray:
+    """
+    :return: (256, 18) table, row = last move, True for the moves which may follow
+    """
+    allowed = np.ones((256, len(POSSIBLE_MOVES)), dtype=bool)
+    for last, last_move in enumerate(POSSIBLE_MOVES):
+        for move, next_move in enumerate(POSSIBLE_MOVES):
+            same_side = last_move[0] == next_move[0]
+            # R L = L R, only one order is needed
+            wrong_order = AXIS_OF_FACE[last_move[0]] == AXIS_OF_FACE[next_move[0]] and \
+                FACE_OF_MOVE[next_move[0]] < FACE_OF_MOVE[last_move[0]]
+            allowed[last, move] = not (same_side or wrong_order)
+    return allowed
+
+
+ALLOWED_MOVES = _allowed_moves()
+
+_MOVE_CP = np.array([MOVE_CUBIES[move].cp for move in POSSIBLE_MOVES], dtype=np.intp)
+_MOVE_CO = np.array([MOVE_CUBIES[move].co for move in POSSIBLE_MOVES], dtype=np.int8)
+_MOVE_EP = np.array([MOVE_CUBIES[move].ep for move in POSSIBLE_MOVES], dtype=np.intp)
+_MOVE_EO = np.array([MOVE_CUBIES[move].eo for move in POSSIBLE_MOVES], dtype=np.int8)
+
+
+def _key_bytes(records: np.ndarray) -> np.ndarray:
+    """
+    :return: (N, 9) uint8 array of the keys of the records
+    """
+    return np.ascontiguousarray(records['key']).view(np.uint8).reshape(-1, KEY_BYTES)
+
+
+def expand(records: np.ndarray) -> np.ndarray:
+    """
+    apply every move which may follow the last move of a cube (see ALLOWED_MOVES)
+    :param records: RECORD array of cubes
+    :return: RECORD array of their children, unsorted and with duplicates
+    """
+    cp, co, ep, eo = decode_keys(_key_bytes(records))
+    parents, moves = np.nonzero(ALLOWED_MOVES[records['move']])
+
+    # the same as cubie.multiply(cube, MOVE_CUBIES[move]) for every pair
+    corners, edges = _MOVE_CP[moves], _MOVE_EP[moves]
+    rows = parents[:, np.newaxis]
+    children = np.empty(len(moves), dtype=RECORD)
+    keys = encode_cubies(cp[rows, corners], (co[rows, corners] + _MOVE_CO[moves]) % 3,
+                         ep[rows, edges], (eo[rows, edges] + _MOVE_EO[moves]) % 2)
+    children['key'] = keys.view(RECORD['key']).ravel()
+    children['move'] = moves
+    return children
+
+
+def _sort_unique(records: np.ndarray) -> np.ndarray:
+    """
+    :return: the records sorted by key, only the first record of every key
+    """
+    records = records[np.argsort(records['key'], kind='stable')]
+    keep = np.ones(len(records), dtype=bool)
+    keep[1:] = records['key'][1:] != records['key'][:-1]
+    return records[keep]
+
+
+def _read(file, position: int, count: int) -> np.ndarray:
+    """
+    :return: count records (less at the end) of a record file, starting at record position
+    """
+    file.seek(position * RECORD.itemsize)
+    return np.fromfile(file, dtype=RECORD, count=count)
+
+
+def merge_runs(runs: list, excluded: list, file, block_size: int = MERGE_BLOCK) -> int:
+    """
+    merge sorted run files into one sorted file without duplicates, block by block (every file is read once, from the
+    start to the end, so the memory only depends on the block size)
+    :param runs: names of sorted record files
+    :param excluded: names of sorted record files whose keys are left out (e.g. the levels before)
+    :param file: binary file for the merged records
+    :param block_size: records read of every file per step
+    :return: number of written records
+    """
+    run_files = [open(name, 'rb') for name in runs]
+    excluded_files = [open(name, 'rb') for name in excluded]
+    try:
+        lengths = [os.path.getsize(name) // RECORD.itemsize for name in runs]
+        positions, excluded_positions, written = [0] * len(runs), [0] * len(excluded), 0
+        while any(position < length for position, length in zip(positions, lengths)):
+            blocks = [_read(run, position, block_size) for run, position in zip(run_files, positions)]
+            # keys up to the smallest last key of a block with more records behind it are complete in this step
+            bound = min((block['key'][-1] for length, position, block in zip(lengths, positions, blocks)
+                         if position + len(block) < length), default=None)
+            taken = []
+            for index, block in enumerate(blocks):
+                count = len(block) if bound is None else int(np.searchsorted(block['key'], bound, side='right'))
+                taken.append(block[:count])
+                positions[index] += count
+            merged = _sort_unique(np.concatenate(taken))
+
+            # the excluded files are read up to the last key of the step
+            for index, excluded_file in enumerate(excluded_files):
+                while len(merged):
+                    block = _read(excluded_file, excluded_positions[index], block_size)
+                    count = int(np.searchsorted(block['key'], merged['key'][-1], side='right'))
+                    merged = merged[~np.isin(merged['key'], block['key'][:count])]
+                    excluded_positions[index] += count
+                    if count < block_size:
+                        break
+            file.write(merged.tobytes())
+            written += len(merged)
+        return written
+    finally:
+        for opened in run_files + excluded_files:
+            opened.close()
+
+
+def _level_file(path: str, depth: int) -> str:
+    return os.path.join(path, f'level_{depth:02d}.bin')
+
+
+def _load(file_name: str) -> np.ndarray:
+    """
+    :return: the records of a file, memory mapped
+    """
+    if os.path.getsize(file_name) == 0:
+        return np.empty(0, dtype=RECORD)  # mmap can not map empty files
+    return np.memmap(file_name, dtype=RECORD, mode='r')
+
+
+def _read_header(path: str) -> dict:
+    with open(os.path.join(path, HEADER_FILE), encoding='utf-8') as file:
+        header = json.load(file)
+    if header.get('format') != FORMAT or header.get('version') != VERSION:
+        raise ValueError(f'{path} is no state space of version {VERSION}.')
+    return header
+
+
+def _write_header(path: str, header: dict) -> None:
+    temporary = os.path.join(path, f'{HEADER_FILE}.tmp')
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(header, file)
+    os.replace(temporary, os.path.join(path, HEADER_FILE))  # the last checkpoint or the new one, nothing between
+
+
+def _write_records(file_name: str, records: np.ndarray) -> None:
+    with open(f'{file_name}.tmp', 'wb') as file:
+        file.write(records.tobytes())
+    os.replace(f'{file_name}.tmp', file_name)
+
+
+def enumerate_states(path: str, max_depth: int, chunk_size: int = CHUNK_SIZE, run_size: int = RUN_SIZE,
+                     block_size: int = MERGE_BLOCK, progress: Callable = None) -> list:
+    """
+    find every cube up to max_depth, continue a stopped search in path
+    :param path: directory of the levels (created if it does not exist)
+    :param max_depth: last depth
+    :param chunk_size: cubes expanded at once
+    :param run_size: children collected before they are sorted and written as one run
+    :param block_size: records read of every run per merge step
+    :param progress: called with (depth, expanded cubes, cubes of the level) after every run
+    :return: number of cubes of every depth
+    """
+    if max_depth < 0: raise ValueError('The depth can not be negative.')
+    os.makedirs(os.path.join(path, RUNS_DIRECTORY), exist_ok=True)
+    if os.path.exists(os.path.join(path, HEADER_FILE)):
+        header = _read_header(path)
+    else:
+        solved = np.empty(1, dtype=RECORD)
+        solved['key'], solved['move'] = Cube(3).key(), NO_MOVE
+        _write_records(_level_file(path, 0), solved)
+        header = {'format': FORMAT, 'version': VERSION, 'depth': 0, 'counts': [1], 'expanding': None}
+        _write_header(path, header)
+
+    while header['depth'] < max_depth:
+        depth = header['depth'] + 1
+        parents_file = _level_file(path, depth - 1)
+        parent_count = os.path.getsize(parents_file) // RECORD.itemsize
+        state = header['expanding'] or {'next_parent': 0, 'runs': []}
+        runs_path = os.path.join(path, RUNS_DIRECTORY)
+        for name in os.listdir(runs_path):
+            if name not in state['runs']:
+                os.remove(os.path.join(runs_path, name))  # written after the last checkpoint
+
+        children, collected = [], 0
+        with open(parents_file, 'rb') as parents:
+            for start in range(state['next_parent'], parent_count, chunk_size):
+                children.append(expand(_read(parents, start, chunk_size)))
+                collected += len(children[-1])
+                end = min(start + chunk_size, parent_count)
+                if collected >= run_size or end == parent_count:
+                    name = f'run_{len(state["runs"]):05d}.bin'
+                    _write_records(os.path.join(runs_path, name), _sort_unique(np.concatenate(children)))
+                    children, collected = [], 0
+                    state = {'next_parent': end, 'runs': state['runs'] + [name]}
+                    header['expanding'] = state
+                    _write_header(path, header)
+                    if progress is not None:
+                        progress(depth, end, parent_count)
+
+        runs = [os.path.join(runs_path, name) for name in state['runs']]
+        excluded = [_level_file(path, level) for level in range(max(depth - 2, 0), depth)]
+        with open(f'{_level_file(path, depth)}.tmp', 'wb') as file:
+            count = merge_runs(runs, excluded, file, block_size)
+        os.replace(f'{_level_file(path, depth)}.tmp', _level_file(path, depth))
+
+        header = {**header, 'depth': depth, 'counts': header['counts'] + [count], 'expanding': None}
+        _write_header(path, header)
+        for name in state['runs']:
+            os.remove(os.path.join(runs_path, name))
+    return header['counts'][:max_depth + 1]
+
+
+class StateSpace:
+    """
+    read the levels written by enumerate_states, memory mapped
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        header = _read_header(path)
+        self.depth = header['depth']
+        self.counts = header['counts']
+        self._levels = {}
+
+    def level(self, depth: int) -> np.ndarray:
+        """
+        :return: RECORD array (memory mapped) of the cubes of a depth, sorted by key
+        """
+        if not 0 <= depth <= self.depth: raise ValueError(f'Depth {depth} is not enumerated (0 .. {self.depth}).')
+        if depth not in self._levels:
+            self._levels[depth] = _load(_level_file(self.path, depth))
+        return self._levels[depth]
+
+    def keys(self, depth: int) -> np.ndarray:
+        """
+        :return: (N, 9) uint8 array of the keys of a depth (see CubeObj.decode)
+        """
+        return _key_bytes(self.level(depth))
+
+    def __iter__(self) -> Iterator:
+        """
+        all cubes as (depth, key), depth by depth
+        """
+        for depth in range(self.depth + 1):
+            level = self.level(depth)
+            for start in range(0, len(level), MERGE_BLOCK):
+                for key in _key_bytes(level[start:start + MERGE_BLOCK]):
+                    yield depth, key.tobytes()
+
+    def depth_of(self, my_cube: Cube) -> int:
+        """
+        :return: the number of moves needed to solve the cube, None if it is deeper than the enumerated depths
+        """
+        key = np.array(my_cube.key(), dtype=RECORD['key'])
+        for depth in range(self.depth + 1):
+            level = self.level(depth)
+            index = np.searchsorted(level['key'], key)
+            if index < len(level) and level['key'][index] == key:
+                return depth
+        return None
+
+    def moves(self, depth: int, index: int) -> list:
+        """
+        :param depth: depth of the cube
+        :param index: index of the cube in its level
+        :return: the moves which lead from the solved cube to the cube (an optimal scramble), found by following the
+                 last moves back through the levels
+        """
+        record = self.level(depth)[index]
+        my_cube = Cube.decode(bytes(record['key']).ljust(KEY_BYTES, b'\0'))  # numpy drops trailing zero bytes
+        moves = []
+        for level in range(depth - 1, -1, -1):
+            move = POSSIBLE_MOVES[record['move']]
+            moves.append(move)
+            my_cube.move(inverse_move(move))
+            parents = self.level(level)
+            record = parents[np.searchsorted(parents['key'], np.array(my_cube.key(), dtype=RECORD['key']))]
+        return moves[::-1]
+
+    def sample(self, depth: int, count: int, seed: int = None) -> list:
+        """
+        :param depth: depth of the cubes
+        :param count: number of cubes, at most all cubes of the depth
+        :param seed: seed of the random choice
+        :return: the moves of count different random cubes of the depth (see moves)
+        """
+        indices = np.random.default_rng(seed).choice(self.counts[depth], size=min(count, self.counts[depth]),
+                                                     replace=False)
+        return [self.moves(depth, int(index)) for index in sorted(indices)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='find every cube up to a depth (breadth-first, levels on disk)')
+    parser.add_argument('path', help='directory of the levels, an existing search continues')
+    parser.add_argument('--depth', type=int, default=6)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--run-size', type=int, default=RUN_SIZE)
+    parser.add_argument('--block-size', type=int, default=MERGE_BLOCK)
+    arguments = parser.parse_args()
+
+    def report(depth: int, expanded: int, total: int) -> None:
+        print(f'depth {depth}: {expanded} / {total} cubes expanded', flush=True)
+
+    counts = enumerate_states(arguments.path, arguments.depth, arguments.chunk_size, arguments.run_size,
+                              arguments.block_size, report)
+    for depth, count in enumerate(counts):
+        print(f'{depth:>3} {count:>14}')
+
+
+if __name__ == '__main__':
+    main()
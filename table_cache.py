@@ -0,0 +1,101 @@
+"""
+Rubik's Cube Solver
+Copyright (C) 2021  Felix Drees
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+How to contact me by electronic and/or paper mail:
+  https://github.com/felix-drees
+"""
+
+"""
+TABLE CACHE:
+
+Tables which are computed from other (source) tables, e.g. the move permutations from the geometry of the cube or the
+compiled swap algorithms from their moves, are built once and saved with marshal in CACHE_DIRECTORY. Every file starts
+with a fingerprint of the sources, the code which builds the table and the cache version, a file with another
+fingerprint is stale and built again. Short-lived processes only load the tables.
+
+Only the standard library is used, so importing this module (and the modules which use it) stays cheap.
+
+EXAMPLE OF USE:
+
+PERMUTATIONS = cached_table('permutations', (GEOMETRY, code_sources(build_permutations)), build_permutations)
+"""
+
+from types import CodeType
+from typing import Callable
+import marshal
+import os
+import sys
+import zlib
+
+
+CACHE_VERSION = 1
+
+# set RUBIKS_CUBE_CACHE to use another directory, e.g. one which is shared by all workers
+CACHE_DIRECTORY = os.environ.get('RUBIKS_CUBE_CACHE',
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+
+
+def fingerprint(sources) -> int:
+    """
+    :param sources: anything with a stable repr, e.g. tuples of the source tables and code objects
+    :return: checksum of the sources, the cache version and the marshal format
+    """
+    return zlib.crc32(repr((CACHE_VERSION, marshal.version, sys.version_info[:2], sources)).encode('utf-8'))
+
+
+def code_sources(*functions: Callable) -> tuple:
+    """
+    :param functions: the functions which build a table
+    :return: their byte code, constants and names, a source of the table (see fingerprint)
+    """
+    def source(code: CodeType) -> tuple:
+        # nested code objects (e.g. of generator expressions) have the memory address in their repr
+        return code.co_code, code.co_names, tuple(source(constant) if isinstance(constant, CodeType) else constant
+                                                  for constant in code.co_consts)
+
+    return tuple(source(function.__code__) for function in functions)
+
+
+def cached_table(name: str, sources, build: Callable, cache_directory: str = None):
+    """
+    load a table from the cache, or build and save it if it is missing or stale
+    :param name: file name of the table (without extension)
+    :param sources: everything the table is computed from, see fingerprint
+    :param build: function without arguments which computes the table (only built-in types, see marshal)
+    :param cache_directory: default CACHE_DIRECTORY
+    :return: the table
+    """
+    path = os.path.join(cache_directory or CACHE_DIRECTORY, f'{name}.marshal')
+    expected = fingerprint(sources)
+    try:
+        with open(path, 'rb') as file:
+            saved, table = marshal.load(file)
+        if saved == expected:
+            return table
+    except (OSError, EOFError, ValueError, TypeError):
+        pass  # missing or broken file
+
+    table = build()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as file:
+            marshal.dump((expected, table), file)
+        os.replace(temporary, path)  # other processes see the old or the new file, nothing between
+    except OSError:
+        pass  # e.g. a read only directory, the table is built again next time
+    return table
@@ -0,0 +1,242 @@
+"""
+Rubik's Cube Solver
+Copyright (C) 2021  Felix Drees
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published
+by the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+How to contact me by electronic and/or paper mail:
+  https://github.com/felix-drees
+"""
+
+"""
+SOLVABILITY:
+
+Only one of 12 sticker states with possible pieces can be reached by turning the cube: the twists of the corners sum
+up to a multiple of 3, the flips of the edges to an even number, and the corner and edge permutations have the same
+parity. A board which breaks one of these rules (a twisted corner, a flipped edge, two swapped pieces) has no solution,
+the solvers would search for it forever or fail somewhere in the middle.
+
+The checks run in this order, the first one which fails is the reason:
+sticker counts (9 of every side) -> six different centers -> centers of a turned, not mirrored cube -> existing,
+distinct pieces -> twist -> flip -> parity
+
+The sides are named after the centers, so a turned whole cube (e.g. after wide moves) is still solvable. The centers of
+a cube with the colours of COLOR_BOARD (or the letters of LETTER_BOARD) have to be one of its 24 orientations, a mirror
+image (e.g. white and yellow swapped) can not be built. Other colours can be numbered in any way, their centers are
+not checked. The Old Pochmann solvers also need the colours of COLOR_BOARD with the centers at their usual positions
+(validate_colour_board).
+
+EXAMPLE OF USE:
+
+validate_state(my_cube.state)  # ValueError with the reason for an unsolvable cube
+validate_colour_board(my_cube.state)  # ValueError for letters, other colours or a turned whole cube
+
+reasons = validate_codes(cubes.states)  # BatchCube, one reason per row, VALID (0) for the solvable ones
+solvable_cubes = BatchCube(states=cubes.states[reasons == VALID])
+"""
+
+from Cube import COLOR_BOARD, move_permutations
+from cubie import CORNER_FACELETS, EDGE_FACELETS, CORNER_FACES, EDGE_FACES, face_codes
+from operator import itemgetter
+
+
+VALID = 0
+WRONG_STICKER_COUNTS = 1
+REPEATED_CENTERS = 2
+IMPOSSIBLE_PIECES = 3
+TWISTED_CORNER = 4
+FLIPPED_EDGE = 5
+PARITY = 6
+MIRRORED_CENTERS = 7
+
+REASONS = {
+    VALID: 'solvable',
+    WRONG_STICKER_COUNTS: 'every side needs 9 stickers of its colour',
+    REPEATED_CENTERS: 'two centers belong to the same side',
+    MIRRORED_CENTERS: 'the centers are a mirror image of the colour scheme',
+    IMPOSSIBLE_PIECES: 'a corner or edge does not exist or exists twice',
+    TWISTED_CORNER: 'the twists of the corners do not sum up to a multiple of 3 (twisted corner)',
+    FLIPPED_EDGE: 'the flips of the edges do not sum up to an even number (flipped edge)',
+    PARITY: 'the corner and edge permutations have a different parity (two swapped pieces)'
+}
+
+
+# sides of the stickers of a piece -> (piece, orientation), the orientations as in cubie
+_CORNER_OF_FACES = {tuple(faces[(offset - twist) % 3] for offset in range(3)): (corner, twist)
+                    for corner, faces in enumerate(CORNER_FACES) for twist in range(3)}
+_EDGE_OF_FACES = {tuple(faces[(offset + flip) % 2] for offset in range(2)): (edge, flip)
+                  for edge, faces in enumerate(EDGE_FACES) for flip in range(2)}
+_CORNER_GATHERS = [itemgetter(*facelets) for facelets in CORNER_FACELETS]
+_EDGE_GATHERS = [itemgetter(*facelets) for facelets in EDGE_FACELETS]
+
+# colour of COLOR_BOARD -> side
+_SIDE_OF_COLOUR = {rows[1][1]: side for side, rows in enumerate(COLOR_BOARD)}
+
+
+def _orientations() -> frozenset:
+    """
+    :return: the centers (side of the center of every side) of the 24 orientations of the cube, turned with x, y and z
+    """
+    # the center of side k moves to side i of the turned cube if the rotation gathers it from side k
+    gathers = [[move_permutations(3)[rotation][side * 9 + 4] // 9 for side in range(6)] for rotation in 'xyz']
+    found, todo = {tuple(range(6))}, [tuple(range(6))]
+    while todo:
+        centers = todo.pop()
+        for gather in gathers:
+            turned = tuple(centers[side] for side in gather)
+            if turned not in found:
+                found.add(turned)
+                todo.append(turned)
+    return frozenset(found)
+
+
+_ORIENTATIONS = _orientations()
+
+
+def _parity(permutation: tuple) -> int:
+    """
+    :return: 0 for an even, 1 for an odd permutation (a cycle of length k is made of k - 1 swaps)
+    """
+    seen, cycles = [False] * len(permutation), 0
+    for start in range(len(permutation)):
+        if not seen[start]:
+            cycles += 1
+            position = start
+            while not seen[position]:
+                seen[position] = True
+                position = permutation[position]
+    return (len(permutation) - cycles) % 2
+
+
+def check_state(state: tuple) -> int:
+    """
+    :param state: flat state of a 3x3x3 CubeObj (colours or letters)
+    :return: VALID or the reason why the cube has no solution (see REASONS)
+    """
+    if len(state) != 54:
+        return WRONG_STICKER_COUNTS
+    stickers = set(state)
+    scheme_known = True
+    if stickers <= _SIDE_OF_COLOUR.keys():
+        codes = [_SIDE_OF_COLOUR[sticker] for sticker in state]
+    elif len(stickers) <= 6:  # other colours, any numbering works, the sides are named after the centers below
+        code_of = {sticker: code for code, sticker in enumerate(stickers)}
+        codes = [code_of[sticker] for sticker in state]
+        scheme_known = False
+    else:
+        try:
+            codes = face_codes(state)  # letters
+        except ValueError:
+            return WRONG_STICKER_COUNTS
+    for side in range(6):
+        if codes.count(side) != 9:
+            return WRONG_STICKER_COUNTS
+    centers = codes[4::9]
+    if sorted(centers) != list(range(6)):
+        return REPEATED_CENTERS
+    if scheme_known and tuple(centers) not in _ORIENTATIONS:
+        return MIRRORED_CENTERS
+    if centers != list(range(6)):
+        side_of = {center: side for side, center in enumerate(centers)}
+        codes = [side_of[code] for code in codes]
+
+    try:
+        cp, co = zip(*[_CORNER_OF_FACES[gather(codes)] for gather in _CORNER_GATHERS])
+        ep, eo = zip(*[_EDGE_OF_FACES[gather(codes)] for gather in _EDGE_GATHERS])
+    except KeyError:
+        return IMPOSSIBLE_PIECES
+    if len(set(cp)) != 8 or len(set(ep)) != 12:
+        return IMPOSSIBLE_PIECES
+
+    if sum(co) % 3:
+        return TWISTED_CORNER
+    if sum(eo) % 2:
+        return FLIPPED_EDGE
+    if _parity(cp) != _parity(ep):
+        return PARITY
+    return VALID
+
+
+def validate_state(state: tuple) -> None:
+    """
+    raise a ValueError if the cube has no solution
+    :param state: flat state of a 3x3x3 CubeObj (colours or letters)
+    """
+    reason = check_state(state)
+    if reason != VALID:
+        raise ValueError(f'The cube has no solution: {REASONS[reason]}.')
+
+
+def validate_colour_board(state: tuple) -> None:
+    """
+    raise a ValueError if the cube does not have the colours of COLOR_BOARD with the centers at their usual positions,
+    the Old Pochmann solvers name their targets after them
+    :param state: flat state of a 3x3x3 CubeObj
+    """
+    unknown = set(state) - _SIDE_OF_COLOUR.keys()
+    if unknown: raise ValueError(f'The cube needs the colours of COLOR_BOARD, >>{min(unknown)}<< is none of them.')
+    if any(_SIDE_OF_COLOUR[state[side * 9 + 4]] != side for side in range(6)):
+        raise ValueError('The centers have to be at their usual positions, the whole cube is turned.')
+
+
+def _inversion_parity(permutations_array: 'np.ndarray') -> 'np.ndarray':
+    import numpy as np
+    parity = np.zeros(len(permutations_array), dtype=np.int64)
+    for index in range(permutations_array.shape[1] - 1):
+        parity += (permutations_array[:, index + 1:] < permutations_array[:, index:index + 1]).sum(axis=1)
+    return parity % 2
+
+
+def validate_codes(codes: 'np.ndarray') -> 'np.ndarray':
+    """
+    check many cubes at once
+    :param codes: (N, 54) array of side indices, e.g. BatchCube.states
+    :return: (N,) uint8 array, VALID or the reason why the cube of the row has no solution (see REASONS)
+    """
+    # the solvers only need check_state, numpy is imported when it is needed
+    from encoding import pieces_of_codes
+    import numpy as np
+
+    codes = np.asarray(codes)
+    if codes.ndim != 2 or codes.shape[1] != 54: raise ValueError('States have to be of shape (N, 54).')
+    reasons = np.zeros(len(codes), dtype=np.uint8)
+
+    def reject(rows: 'np.ndarray', reason: int) -> None:
+        reasons[rows & (reasons == VALID)] = reason  # only the first failing check counts
+
+    counts_wrong = np.zeros(len(codes), dtype=bool)
+    for side in range(6):
+        counts_wrong |= (codes == side).sum(axis=1) != 9
+    reject(counts_wrong, WRONG_STICKER_COUNTS)  # also catches codes outside 0 .. 5
+    centers = codes[:, 4::9].astype(np.int64)
+    reject((np.sort(centers, axis=1) != np.arange(6)).any(axis=1), REPEATED_CENTERS)
+    orientations = [sum(side * 6 ** position for position, side in enumerate(centers)) for centers in _ORIENTATIONS]
+    reject(~np.isin((centers * 6 ** np.arange(6)).sum(axis=1), orientations), MIRRORED_CENTERS)
+
+    # rows rejected up to now may contain any codes, the tables need 0 .. 5
+    codes = np.where(reasons[:, np.newaxis] == VALID, codes, 0).astype(np.int64)
+    centers = np.where(reasons[:, np.newaxis] == VALID, centers, np.arange(6))
+    side_of = np.empty_like(centers)  # name the sides after the centers
+    np.put_along_axis(side_of, centers, np.arange(6), axis=1)
+    corners, edges = pieces_of_codes(np.take_along_axis(side_of, codes, axis=1))
+    reject((corners < 0).any(axis=1) | (edges < 0).any(axis=1), IMPOSSIBLE_PIECES)
+    cp, co = np.divmod(np.maximum(corners, 0), 3)
+    ep, eo = np.divmod(np.maximum(edges, 0), 3)
+    reject((np.sort(cp, axis=1) != np.arange(8)).any(axis=1) | (np.sort(ep, axis=1) != np.arange(12)).any(axis=1),
+           IMPOSSIBLE_PIECES)
+
+    reject(co.sum(axis=1) % 3 != 0, TWISTED_CORNER)
+    reject(eo.sum(axis=1) % 2 != 0, FLIPPED_EDGE)
+    reject(_inversion_parity(cp) != _inversion_parity(ep), PARITY)
+    return reasons